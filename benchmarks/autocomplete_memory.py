@@ -0,0 +1,84 @@
+"""Memory use and query latency of the autocomplete index.
+
+Builds a PrefixIndex over a synthetic catalog with realistic word counts
+and reports what it holds on to and how long lookups take.
+
+    python -m benchmarks.autocomplete_memory [books]
+"""
+
+import itertools
+import random
+import string
+import sys
+import time
+import tracemalloc
+import uuid
+
+from src.books.autocomplete import PrefixIndex
+
+QUERIES = ["th", "harr", "the lor", "silmar", "tolkein", "garcia marq", "zz"]
+ITERATIONS = 1000
+
+
+def make_words(rng: random.Random, size: int) -> list:
+    words = set()
+    while len(words) < size:
+        length = rng.randint(3, 10)
+        words.add("".join(rng.choices(string.ascii_lowercase, k=length)))
+    return list(words)
+
+
+def make_catalog(books: int) -> list:
+    rng = random.Random(42)
+    title_words = ["the", "of", "and", "harry", "lord", "rings", "silmarillion"]
+    title_words += make_words(rng, 100000)
+    # title words follow a long tail, like real titles
+    cum_weights = list(
+        itertools.accumulate(1 / (rank + 1) for rank in range(len(title_words)))
+    )
+    first_names = ["gabriel", "john"] + make_words(rng, 5000)
+    surnames = ["tolkien", "garcia", "marquez"] + make_words(rng, 50000)
+
+    catalog = []
+    for _ in range(books):
+        words = rng.choices(title_words, cum_weights=cum_weights, k=rng.randint(1, 6))
+        author = f"{rng.choice(first_names)} {rng.choice(surnames)}"
+        title = " ".join(words).capitalize()
+        catalog.append((str(uuid.uuid4()), title, author.title()))
+    return catalog
+
+
+def main(books: int) -> None:
+    catalog = make_catalog(books)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = PrefixIndex.build(catalog)
+    build_time = time.perf_counter() - start
+    # the id strings and titles are shared with the catalog list, so this
+    # is an underestimate by their size
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    catalog_bytes = sum(
+        sys.getsizeof(book_id) + sys.getsizeof(title) + sys.getsizeof(author)
+        for book_id, title, author in catalog
+    )
+
+    print(f"books:           {books:,}")
+    print(f"distinct words:  {len(index._terms):,}")
+    print(f"build time:      {build_time:.1f}s")
+    print(f"index structures {index_bytes / 2**20:,.0f} MiB")
+    print(f"ids and strings  {catalog_bytes / 2**20:,.0f} MiB")
+    print(f"total            {(index_bytes + catalog_bytes) / 2**20:,.0f} MiB")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            index.search(query, 10)
+        elapsed = (time.perf_counter() - start) / ITERATIONS
+        print(f"{query!r:14} {elapsed * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
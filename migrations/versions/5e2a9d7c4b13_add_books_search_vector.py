@@ -0,0 +1,62 @@
+"""add books search vector
+
+Revision ID: 5e2a9d7c4b13
+Revises: 8b1f4c7d2e90
+Create Date: 2026-10-18 12:41:55.870316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a9d7c4b13'
+down_revision: Union[str, None] = '8b1f4c7d2e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# kept in step with BOOK_SEARCH_VECTOR in src/db/models.py
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', author), 'B') || "
+    "setweight(to_tsvector('english', publisher), 'C')"
+)
+
+
+def upgrade() -> None:
+    # adding a stored generated column rewrites the table under an exclusive
+    # lock, so run this in a maintenance window on large catalogs
+    op.add_column(
+        'books',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_books_search_vector',
+            'books',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_books_search_vector',
+            table_name='books',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('books', 'search_vector')
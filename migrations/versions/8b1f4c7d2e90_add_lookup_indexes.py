@@ -0,0 +1,54 @@
+"""add lookup indexes
+
+Revision ID: 8b1f4c7d2e90
+Revises: c3d9e5a1b7f2
+Create Date: 2026-10-18 11:03:17.224905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1f4c7d2e90'
+down_revision: Union[str, None] = 'c3d9e5a1b7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# books.user_id is already covered by ix_books_user_id_created_at_id
+INDEXES = [
+    ('ix_users_email', 'users', ['email']),
+    ('ix_reviews_book_id', 'reviews', ['book_id']),
+    ('ix_reviews_user_id', 'reviews', ['user_id']),
+    ('ix_tags_name', 'tags', ['name']),
+    ('ix_booktag_tag_id', 'booktag', ['tag_id']),
+]
+
+
+def upgrade() -> None:
+    # built concurrently so the tables stay writable; an interrupted build
+    # leaves an INVALID index behind that has to be dropped before retrying
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,80 @@
+"""add books rating aggregates
+
+Revision ID: a71c3e9f5d28
+Revises: 5e2a9d7c4b13
+Create Date: 2026-10-18 14:20:06.318452
+
+"""
+from typing import Sequence, Union
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a71c3e9f5d28'
+down_revision: Union[str, None] = '5e2a9d7c4b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+BACKFILL_BATCH = sa.text(
+    """
+    WITH batch AS (
+        SELECT id FROM books WHERE id > :last_id ORDER BY id LIMIT :batch_size
+    ),
+    totals AS (
+        SELECT batch.id,
+               count(reviews.id) AS review_count,
+               coalesce(sum(reviews.rating), 0) AS rating_sum
+        FROM batch
+        LEFT JOIN reviews ON reviews.book_id = batch.id
+        GROUP BY batch.id
+    )
+    UPDATE books
+    SET review_count = totals.review_count,
+        rating_sum = totals.rating_sum,
+        avg_rating = totals.rating_sum::float8 / nullif(totals.review_count, 0)
+    FROM totals
+    WHERE books.id = totals.id
+    RETURNING books.id
+    """
+)
+
+
+def upgrade() -> None:
+    # constant defaults don't rewrite the table, so these are quick
+    op.add_column(
+        'books',
+        sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.add_column(
+        'books',
+        sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.add_column(
+        'books',
+        sa.Column('avg_rating', postgresql.DOUBLE_PRECISION(), nullable=True),
+    )
+
+    # one short transaction per batch, so no book row stays locked for long
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        last_id = uuid.UUID(int=0)
+        while True:
+            ids = connection.execute(
+                BACKFILL_BATCH, {'last_id': last_id, 'batch_size': BATCH_SIZE}
+            ).scalars().all()
+            if not ids:
+                break
+            last_id = max(ids)
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'avg_rating')
+    op.drop_column('books', 'rating_sum')
+    op.drop_column('books', 'review_count')
@@ -0,0 +1,57 @@
+"""add books keyset indexes
+
+Revision ID: c3d9e5a1b7f2
+Revises: f7a2c1291c7f
+Create Date: 2026-10-18 10:12:41.503127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9e5a1b7f2'
+down_revision: Union[str, None] = 'f7a2c1291c7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction, but it keeps the books
+    # table writable while the indexes build
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_books_created_at_id',
+            'books',
+            ['created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_books_user_id_created_at_id',
+            'books',
+            ['user_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_books_user_id_created_at_id',
+            table_name='books',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_books_created_at_id',
+            table_name='books',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
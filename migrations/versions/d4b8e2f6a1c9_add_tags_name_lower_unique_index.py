@@ -0,0 +1,79 @@
+"""add tags name lower unique index
+
+Revision ID: d4b8e2f6a1c9
+Revises: a71c3e9f5d28
+Create Date: 2026-10-18 16:42:51.507318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e2f6a1c9'
+down_revision: Union[str, None] = 'a71c3e9f5d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# tags whose names only differ in case are folded into the oldest one
+MERGE_DUPLICATES = [
+    """
+    CREATE TEMPORARY TABLE tag_merges ON COMMIT DROP AS
+    SELECT id, first_value(id) OVER (
+               PARTITION BY lower(name) ORDER BY created_at, id
+           ) AS keep_id
+    FROM tags
+    """,
+    "DELETE FROM tag_merges WHERE id = keep_id",
+    """
+    INSERT INTO booktag (book_id, tag_id)
+    SELECT booktag.book_id, tag_merges.keep_id
+    FROM booktag JOIN tag_merges ON tag_merges.id = booktag.tag_id
+    ON CONFLICT DO NOTHING
+    """,
+    "DELETE FROM booktag USING tag_merges WHERE booktag.tag_id = tag_merges.id",
+    "DELETE FROM tags USING tag_merges WHERE tags.id = tag_merges.id",
+]
+
+
+def upgrade() -> None:
+    for statement in MERGE_DUPLICATES:
+        op.execute(statement)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_tags_name_lower',
+            'tags',
+            [sa.text('lower(name)')],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # name lookups go through lower(name) now
+        op.drop_index(
+            'ix_tags_name',
+            table_name='tags',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tags_name',
+            'tags',
+            ['name'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ux_tags_name_lower',
+            table_name='tags',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,66 @@
+"""add reviews keyset indexes
+
+Revision ID: e9c3a7b5d2f1
+Revises: d4b8e2f6a1c9
+Create Date: 2026-10-18 17:35:12.840163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c3a7b5d2f1'
+down_revision: Union[str, None] = 'd4b8e2f6a1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_reviews_book_id_created_at_id', ['book_id', 'created_at', 'id']),
+    (
+        'ix_reviews_book_id_rating_created_at_id',
+        ['book_id', 'rating', 'created_at', 'id'],
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name,
+                'reviews',
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        # lookups by book_id alone are served by the new indexes
+        op.drop_index(
+            'ix_reviews_book_id',
+            table_name='reviews',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_reviews_book_id',
+            'reviews',
+            ['book_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for name, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name='reviews',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
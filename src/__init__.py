@@ -3,12 +3,15 @@ from src.books.routes import book_router
 from src.auth.routes import auth_router
 from src.reviews.routes import review_router
 from src.tags.routes import tags_router
+from src.monitoring.routes import monitoring_router
+from src.lifespan import lifespan
 from .errors import register_error_handlers
 from .middleware import register_middleware
 
 
 version = "v1"
 
+
 app = FastAPI(
     version=version,
     title="Bookly",
@@ -21,6 +24,7 @@ app = FastAPI(
         "url": "https://github.com/kolawolejohn/fastapi-deep-dive",
     },
     openapi_url=f"/api/{version}/openapi.json",
+    lifespan=lifespan,
 )
 
 register_error_handlers(app)
@@ -30,6 +34,9 @@ app.include_router(book_router, prefix=f"/api/{version}/books", tags=["books"])
 app.include_router(auth_router, prefix=f"/api/{version}/auth", tags=["auth"])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=["reviews"])
 app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"])
+app.include_router(
+    monitoring_router, prefix=f"/api/{version}/monitoring", tags=["monitoring"]
+)
 
 
 # run the code with:  fastapi dev src/
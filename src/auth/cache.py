@@ -0,0 +1,34 @@
+from typing import Optional
+import uuid
+from src.auth.schemas import UserPrincipal
+from src.cache import LRUCache
+from src.config import Config
+from src.db.redis import publish, subscribe
+
+PRINCIPAL_INVALIDATION_CHANNEL = "principal_invalidations"
+
+principal_cache = LRUCache(
+    maxsize=Config.PRINCIPAL_CACHE_SIZE, ttl=Config.PRINCIPAL_CACHE_TTL
+)
+
+
+def get_cached_principal(user_id: str) -> Optional[UserPrincipal]:
+    return principal_cache.get(str(user_id))
+
+
+def cache_principal(principal: UserPrincipal, generation: int) -> None:
+    """Cache a principal unless an invalidation arrived while it was loading"""
+    if generation == principal_cache.generation:
+        principal_cache.set(str(principal.id), principal)
+
+
+async def invalidate_principal(user_id: uuid.UUID | str) -> None:
+    principal_cache.delete(str(user_id))
+    await publish(PRINCIPAL_INVALIDATION_CHANNEL, str(user_id))
+
+
+subscribe(
+    PRINCIPAL_INVALIDATION_CHANNEL,
+    principal_cache.delete,
+    on_resync=principal_cache.clear,
+)
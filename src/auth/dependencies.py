@@ -2,10 +2,12 @@ from typing import Any, List
 from fastapi import Depends, Request
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
-from src.auth.utils import decode_token
+from src.auth.utils import decode_token_cached
 from src.db.redis import token_in_blocklist
 from src.db.main import get_session
 from sqlmodel.ext.asyncio.session import AsyncSession
+from src.auth.cache import cache_principal, get_cached_principal, principal_cache
+from src.auth.schemas import UserPrincipal
 from src.auth.service import UserService
 from src.db.models import User
 from src.errors import (
@@ -28,22 +30,18 @@ class TokenBearer(HTTPBearer):
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
         creds = await super().__call__(request)
 
-        token = creds.credentials
-        token_data = decode_token(token)
-        if not self.token_valid(token):
+        token_data = decode_token_cached(creds.credentials)
+        if token_data is None:
             raise InvalidToken()
 
         if await token_in_blocklist(token_data["jti"]):
             raise RevokedToken()
 
         self.verify_token_data(token_data)
+        request.state.token_data = token_data
 
         return token_data
 
-    def token_valid(self, token: str) -> bool:
-        data = decode_token(token)
-        return data is not None
-
     def verify_token_data(self, token_data):
         raise NotImplementedError("Please override this method in parent classes")
 
@@ -60,23 +58,41 @@ class RefreshTokenBearer(TokenBearer):
             raise RefreshTokenRequired()
 
 
+access_token_bearer = AccessTokenBearer()
+
+
+async def get_current_principal(
+    token_detail: dict = Depends(access_token_bearer),
+    session: AsyncSession = Depends(get_session),
+) -> UserPrincipal:
+    user_id = token_detail["user"]["user_id"]
+    principal = get_cached_principal(user_id)
+    if principal is None:
+        generation = principal_cache.generation
+        principal = await user_service.get_principal(user_id, session)
+        if principal is None:
+            raise InvalidToken()
+        cache_principal(principal, generation)
+    return principal
+
+
 async def get_current_user(
-    token_detail: dict = Depends(AccessTokenBearer()),
+    principal: UserPrincipal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
-):
-    user_email = token_detail["user"]["email"]
-    user = await user_service.get_user_by_email(user_email, session)
-    return user
+) -> User:
+    return await user_service.get_user(principal.id, session)
 
 
 class RoleChecker:
     def __init__(self, allowe_roles: List[str]) -> None:
         self.allowed_roles = allowe_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user)) -> Any:
-        if not current_user.is_verified:
+    async def __call__(
+        self, principal: UserPrincipal = Depends(get_current_principal)
+    ) -> Any:
+        if not principal.is_verified:
             raise AccountNotVerified()
-        if current_user.role in self.allowed_roles:
+        if principal.role in self.allowed_roles:
             return True
 
         raise InsufficientPermission()
@@ -5,11 +5,11 @@ from fastapi import APIRouter, BackgroundTasks, Depends, status
 from fastapi.responses import JSONResponse
 
 from src.auth.dependencies import (
-    AccessTokenBearer,
     RefreshTokenBearer,
+    access_token_bearer,
+    get_current_principal,
     get_role_checker,
 )
-from src.db.models import User
 from src.auth.schemas import (
     EmailModel,
     LoginResponseModel,
@@ -19,20 +19,20 @@ from src.auth.schemas import (
     UserBooksModel,
     UserCreateModel,
     UserLoginModel,
+    UserPrincipal,
 )
 from src.auth.service import UserService, get_user_service
+from src.auth.throttling import throttle_login
 from src.db.main import get_session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.utils import (
     create_access_token,
     create_url_safe_token,
     decode_url_safe_token,
-    generate_password_hash,
-    verify_password,
+    password_hasher,
 )
 from src.config import Config
 from src.db.redis import add_jti_to_blocklist
-from src.auth.dependencies import get_current_user
 from src.errors import (
     InvalidCredentials,
     InvalidToken,
@@ -115,7 +115,10 @@ async def verify_token(
 
 
 @auth_router.post(
-    "/login", status_code=status.HTTP_200_OK, response_model=LoginResponseModel
+    "/login",
+    status_code=status.HTTP_200_OK,
+    response_model=LoginResponseModel,
+    dependencies=[Depends(throttle_login)],
 )
 async def user_login(
     data: UserLoginModel,
@@ -124,9 +127,18 @@ async def user_login(
 ):
     email, password = data.email, data.password
     user = await user_service.get_user_by_email(email, session)
-    if not user or not verify_password(password, user.password_hash):
+    if not user:
         raise InvalidCredentials()
 
+    password_valid, new_hash = await password_hasher.verify_and_update(
+        password, user.password_hash
+    )
+    if not password_valid:
+        raise InvalidCredentials()
+    if new_hash:
+        # the stored hash used an old work factor
+        await user_service.update_user(user, {"password_hash": new_hash}, session)
+
     access_token = create_access_token(
         data={"email": user.email, "user_id": str(user.id), "role": user.role}
     )
@@ -158,14 +170,16 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
 
 @auth_router.get("/me", response_model=UserBooksModel)
 async def get_current_user(
-    user: User = Depends(get_current_user),
+    principal: UserPrincipal = Depends(get_current_principal),
     _: bool = Depends(get_role_checker),
+    session: AsyncSession = Depends(get_session),
+    user_service: UserService = Depends(get_user_service),
 ):
-    return user
+    return await user_service.get_user_profile(principal.id, session)
 
 
 @auth_router.get("/logout")
-async def revoke_token(token_details: dict = Depends(AccessTokenBearer())):
+async def revoke_token(token_details: dict = Depends(access_token_bearer)):
     jti = token_details["jti"]
 
     await add_jti_to_blocklist(jti)
@@ -214,7 +228,7 @@ async def reset_account_password(
         if not user:
             raise UserNotFound()
 
-        passwd_hash = generate_password_hash(passwords.new_password)
+        passwd_hash = await password_hasher.hash(passwords.new_password)
         await user_service.update_user(user, {"password_hash": passwd_hash}, session)
 
         return JSONResponse(
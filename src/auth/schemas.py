@@ -28,6 +28,12 @@ class UserModel(BaseModel):
     updated_at: datetime
 
 
+class UserPrincipal(BaseModel):
+    id: uuid.UUID
+    role: str
+    is_verified: bool
+
+
 class UserBooksModel(UserModel):
     books: List[Book]
     reviews: List[ReviewModel]
@@ -1,21 +1,43 @@
 from fastapi import HTTPException, status
+from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
-from src.auth.schemas import UserCreateModel, UserLoginModel
-from src.auth.utils import generate_password_hash
+from src.auth.schemas import UserCreateModel, UserLoginModel, UserPrincipal
+from src.auth.cache import invalidate_principal
+from src.auth.utils import password_hasher
+from src.db.loaders import row_loader
 from src.db.models import User
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 class UserService:
     async def get_user_by_email(self, email: str, session: AsyncSession):
-        statement = select(User).where(User.email == email)
+        return await row_loader(session, User, User.email, key=None).load(email)
+
+    async def get_user(self, user_id, session: AsyncSession):
+        return await row_loader(session, User, User.id).load(user_id)
+
+    async def get_principal(self, user_id: str, session: AsyncSession):
+        statement = select(User.id, User.role, User.is_verified).where(
+            User.id == user_id
+        )
 
         result = await session.exec(statement)
 
-        user = result.first()
+        row = result.first()
 
-        return user
+        return UserPrincipal(**row._mapping) if row is not None else None
+
+    async def get_user_profile(self, user_id: str, session: AsyncSession):
+        statement = (
+            select(User)
+            .where(User.id == user_id)
+            .options(selectinload(User.books), selectinload(User.reviews))
+        )
+
+        result = await session.exec(statement)
+
+        return result.first()
 
     async def user_exists(self, email: str, session: AsyncSession):
         user = await self.get_user_by_email(email, session)
@@ -27,7 +49,7 @@ class UserService:
 
         new_user = User(
             **data_dict,
-            password_hash=generate_password_hash(data_dict["password"]),
+            password_hash=await password_hasher.hash(data_dict["password"]),
             role="user"
         )
 
@@ -42,6 +64,7 @@ class UserService:
         for k, v in data.items():
             setattr(user, k, v)
         await session.commit()
+        await invalidate_principal(user.id)
 
         return user
 
@@ -0,0 +1,98 @@
+import math
+import time
+from fastapi import Request
+from pyrate_limiter import InMemoryBucket, Rate, RateItem, RedisBucket
+from pyrate_limiter.buckets.redis_bucket import LuaScript
+from redis.exceptions import NoScriptError, RedisError
+from src.auth.schemas import UserLoginModel
+from src.auth.utils import RateLimitedLog
+from src.cache import LRUCache
+from src.config import Config
+from src.db.redis import redis_client
+from src.errors import TooManyLoginAttempts
+
+throttle_failure_log = RateLimitedLog(interval=Config.FAILURE_LOG_INTERVAL)
+
+
+class SlidingWindowThrottle:
+    """Allows `limit` attempts per key in any `window` seconds.
+
+    Attempts are logged in a Redis sorted set per key so the limit holds
+    across workers. If Redis can't be reached each worker falls back to
+    its own in-memory buckets.
+    """
+
+    def __init__(self, name: str, limit: int, window: int):
+        self.name = name
+        self.rates = [Rate(limit, window * 1000)]
+        self.window = window
+        self._script_hash = None
+        self._local_buckets = LRUCache(maxsize=Config.LOGIN_THROTTLE_LOCAL_KEYS)
+
+    async def _redis_bucket(self, key: str) -> RedisBucket:
+        if self._script_hash is None:
+            self._script_hash = await redis_client.script_load(LuaScript.PUT_ITEM)
+        return RedisBucket(self.rates, redis_client, key, self._script_hash)
+
+    def _local_bucket(self, key: str) -> InMemoryBucket:
+        bucket = self._local_buckets.get(key)
+        if bucket is None:
+            bucket = InMemoryBucket(self.rates)
+        # keep an active key alive for as long as it has attempts in the window
+        self._local_buckets.set(key, bucket, ttl=self.window)
+        return bucket
+
+    async def _put_redis(self, key: str, item: RateItem) -> float:
+        bucket = await self._redis_bucket(key)
+        if await bucket.put(item):
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(key, 0, item.timestamp - self.rates[0].interval)
+                pipe.expire(key, self.window)
+                await pipe.execute()
+            return 0
+        return await bucket.waiting(item)
+
+    def _put_local(self, key: str, item: RateItem) -> float:
+        bucket = self._local_bucket(key)
+        bucket.leak(item.timestamp)
+        if bucket.put(item):
+            return 0
+        return bucket.waiting(item)
+
+    async def hit(self, identity: str) -> int:
+        """Record an attempt, returning 0 if allowed or else the seconds to wait"""
+        key = f"throttle:{self.name}:{identity}"
+        item = RateItem(self.name, int(time.time() * 1000))
+        try:
+            try:
+                wait_ms = await self._put_redis(key, item)
+            except NoScriptError:
+                # Redis restarted and dropped the script cache
+                self._script_hash = None
+                wait_ms = await self._put_redis(key, item)
+        except RedisError as e:
+            throttle_failure_log.warning("Login throttle using memory: %s", e)
+            wait_ms = self._put_local(key, item)
+
+        return math.ceil(wait_ms / 1000) if wait_ms else 0
+
+
+ip_throttle = SlidingWindowThrottle(
+    "login_ip", limit=Config.LOGIN_IP_LIMIT, window=Config.LOGIN_IP_WINDOW
+)
+account_throttle = SlidingWindowThrottle(
+    "login_account",
+    limit=Config.LOGIN_ACCOUNT_LIMIT,
+    window=Config.LOGIN_ACCOUNT_WINDOW,
+)
+
+
+async def throttle_login(request: Request, data: UserLoginModel) -> None:
+    """Reject login bursts per client IP and per account before any real work"""
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await ip_throttle.hit(client_ip)
+    if not retry_after:
+        # a throttled IP doesn't get to use up the account's budget as well
+        retry_after = await account_throttle.hit(data.email.strip().lower())
+    if retry_after:
+        raise TooManyLoginAttempts(retry_after)
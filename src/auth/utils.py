@@ -1,14 +1,56 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+import hashlib
 import logging
-from typing import Optional
+import time
+from typing import Optional, Tuple
 from jwt.exceptions import DecodeError
 import uuid
 import jwt
 from passlib.context import CryptContext
+from src.cache import LRUCache
 from src.config import Config
+from src.errors import ServerBusy
 from itsdangerous import URLSafeTimedSerializer
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashes made with any other work factor are rehashed on the next login
+password_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS,
+)
+
+# claims of tokens whose signature has already been checked, keyed by a
+# digest of the token and kept until the token itself expires
+verified_token_cache = LRUCache(maxsize=Config.TOKEN_CACHE_SIZE)
+
+
+class RateLimitedLog:
+    """Log at most one message per interval and count the ones dropped"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.suppressed = 0
+        self._last_logged = float("-inf")
+
+    def warning(self, message: str, *args) -> None:
+        now = time.monotonic()
+        if now - self._last_logged < self.interval:
+            self.suppressed += 1
+            return
+
+        if self.suppressed:
+            message += " (%d similar messages suppressed)"
+            args = (*args, self.suppressed)
+        logging.warning(message, *args)
+        self._last_logged = now
+        self.suppressed = 0
+
+
+token_failure_log = RateLimitedLog(interval=Config.FAILURE_LOG_INTERVAL)
 
 
 def generate_password_hash(password: str) -> str:
@@ -20,6 +62,82 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return password_context.verify(password, hashed_password)
 
 
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so it never blocks the event loop.
+
+    Callers queue for one of `workers` slots and give up with ServerBusy
+    after `queue_timeout` seconds.
+    """
+
+    def __init__(self, workers: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.calls = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.in_use = 0
+        self.wait_time = 0.0
+        self.hash_time = 0.0
+        self._slots = asyncio.Semaphore(workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+
+    async def _run(self, func, *args):
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ServerBusy()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.wait_time += started_at - queued_at
+        self.in_use += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.calls += 1
+            self.in_use -= 1
+            self.hash_time += time.perf_counter() - started_at
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password)
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Check a password, returning a new hash if the stored one is outdated"""
+        return await self._run(
+            password_context.verify_and_update, password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_wait_time": self.wait_time / self.calls if self.calls else 0.0,
+            "avg_hash_time": self.hash_time / self.calls if self.calls else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=Config.PASSWORD_HASH_WORKERS,
+    queue_timeout=Config.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+
 def create_access_token(
     data: dict,
     expiry: timedelta = None,
@@ -50,10 +168,25 @@ def decode_token(token: str) -> Optional[dict]:
         return token_data
 
     except jwt.PyJWTError as e:
-        logging.exception(e)
+        token_failure_log.warning("Rejected token: %s", e)
         return None
 
 
+def decode_token_cached(token: str) -> Optional[dict]:
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = verified_token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
+    token_data = decode_token(token)
+    if token_data is not None:
+        ttl = token_data["exp"] - time.time()
+        if ttl > 0:
+            verified_token_cache.set(key, token_data, ttl=ttl)
+
+    return token_data
+
+
 serializer = URLSafeTimedSerializer(
     secret_key=Config.JWT_SECRET_KEY, salt="email-configuration"
 )
@@ -0,0 +1,238 @@
+import asyncio
+import bisect
+import logging
+import re
+import unicodedata
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlmodel import select
+from src.config import Config
+from src.db.main import async_session_maker
+from src.db.models import Book
+from src.db.redis import MirroredIndex
+
+logger = logging.getLogger(__name__)
+
+BOOK_CHANGES_CHANNEL = "book_changes"
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and reduce punctuation to single spaces"""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f" {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def words_of(title: str, author: str) -> Iterable[str]:
+    return dict.fromkeys(f"{normalize(title)} {normalize(author)}".split())
+
+
+class PrefixIndex:
+    """Word index over book titles and authors.
+
+    The last word of a query is matched as a prefix of any indexed word and
+    earlier words must match whole words. A word with no match falls back
+    to the indexed words of similar length that share the most trigrams
+    with it, which is what makes the lookup tolerant of typos.
+    """
+
+    def __init__(self):
+        self._books: Dict[str, Tuple[str, str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # sorted, so the words sharing a prefix sit next to each other
+        self._terms: List[str] = []
+        self._terms_sorted = True
+        self._trigrams: Dict[Tuple[str, int], Set[str]] = {}
+
+    @classmethod
+    def build(cls, books: Iterable[Tuple[str, str, str]]) -> "PrefixIndex":
+        index = cls()
+        # sorting once at the end is much cheaper than keeping the list
+        # sorted through hundreds of thousands of inserts
+        index._terms_sorted = False
+        for book_id, title, author in books:
+            index.add(book_id, title, author)
+        index._terms.sort()
+        index._terms_sorted = True
+        return index
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def add(self, book_id: str, title: str, author: str) -> None:
+        self.remove(book_id)
+        self._books[book_id] = (title, author)
+
+        for term in words_of(title, author):
+            books = self._postings.get(term)
+            if books is None:
+                books = self._postings[term] = set()
+                if self._terms_sorted:
+                    bisect.insort(self._terms, term)
+                else:
+                    self._terms.append(term)
+                for trigram in trigrams(term):
+                    key = (trigram, len(term))
+                    self._trigrams.setdefault(key, set()).add(term)
+            books.add(book_id)
+
+    def remove(self, book_id: str) -> None:
+        entry = self._books.pop(book_id, None)
+        if entry is None:
+            return
+
+        for term in words_of(*entry):
+            books = self._postings[term]
+            books.discard(book_id)
+            if books:
+                continue
+            del self._postings[term]
+            del self._terms[bisect.bisect_left(self._terms, term)]
+            for trigram in trigrams(term):
+                key = (trigram, len(term))
+                similar = self._trigrams[key]
+                similar.discard(term)
+                if not similar:
+                    del self._trigrams[key]
+
+    def _prefix_terms(self, prefix: str) -> Iterable[str]:
+        terms = self._terms
+        for position in range(bisect.bisect_left(terms, prefix), len(terms)):
+            if not terms[position].startswith(prefix):
+                break
+            yield terms[position]
+
+    def _similar_terms(self, word: str) -> List[str]:
+        wanted = trigrams(word)
+        shared = Counter()
+        # a one or two letter typo barely changes a word's length
+        for length in range(max(1, len(word) - 2), len(word) + 3):
+            for trigram in wanted:
+                shared.update(self._trigrams.get((trigram, length), ()))
+
+        threshold = Config.AUTOCOMPLETE_MIN_SIMILARITY
+        # no term two letters shorter can reach the threshold with fewer
+        # trigrams in common than this, which rules most of them out cheaply
+        min_shared = threshold * (2 * len(wanted) - 2) / (1 + threshold)
+        scored = []
+        for term, count in shared.items():
+            if count < min_shared:
+                continue
+            similarity = count / (len(wanted) + len(term) - count)
+            if similarity >= threshold:
+                scored.append((similarity, term))
+        scored.sort(reverse=True)
+        return [term for _, term in scored[: Config.AUTOCOMPLETE_FUZZY_TERMS]]
+
+    def _word_matches(self, word: str) -> Set[str]:
+        if word in self._postings:
+            return self._postings[word]
+        return set().union(*(self._postings[t] for t in self._similar_terms(word)))
+
+    def _prefix_matches(self, prefix: str, within: Optional[Set[str]], limit: int):
+        """Up to limit books with a word starting with prefix, optionally
+        restricted to the books in within"""
+        found: Dict[str, None] = {}
+        # a short prefix can match most of the catalog, so stop as soon as
+        # there are enough books rather than collecting all of them
+        for term in self._prefix_terms(prefix):
+            books = self._postings[term]
+            if within is not None:
+                # walk the smaller set lazily; a full intersection of two
+                # common words costs milliseconds when only a few are needed
+                smaller, larger = sorted((books, within), key=len)
+                books = (book_id for book_id in smaller if book_id in larger)
+            found.update(dict.fromkeys(islice(books, limit - len(found))))
+            if len(found) >= limit:
+                break
+
+        if not found:
+            fuzzy = self._word_matches(prefix)
+            if within is not None:
+                fuzzy = within & fuzzy
+            found = dict.fromkeys(islice(fuzzy, limit))
+        return list(found)
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        words = normalize(query).split()
+        if not words:
+            return []
+        *whole_words, prefix = words
+
+        candidates: Optional[Set[str]] = None
+        # rarest first so the intersection shrinks as quickly as possible
+        for matches in sorted(map(self._word_matches, whole_words), key=len):
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+
+        # rank a few more than asked for, so prefix order matters less
+        matches = self._prefix_matches(prefix, candidates, limit * 4)
+
+        normalized_query = " ".join(words)
+        results = []
+        for book_id in matches:
+            title, author = self._books[book_id]
+            starts_title = normalize(title).startswith(normalized_query)
+            results.append((not starts_title, len(title), title, book_id, author))
+        results.sort()
+        return [
+            {"id": book_id, "title": title, "author": author}
+            for _, _, title, book_id, author in results[:limit]
+        ]
+
+
+class BookAutocomplete(MirroredIndex):
+    """Keeps this worker's PrefixIndex in step with the books table"""
+
+    name = "autocomplete index"
+
+    def __init__(self):
+        super().__init__(BOOK_CHANGES_CHANNEL)
+        self.index = PrefixIndex()
+
+    async def load(self) -> PrefixIndex:
+        books = []
+        async with async_session_maker() as session:
+            result = await session.stream(
+                select(Book.id, Book.title, Book.author).execution_options(
+                    yield_per=Config.AUTOCOMPLETE_BUILD_BATCH_SIZE
+                )
+            )
+            async for rows in result.partitions():
+                books.extend((str(id), title, author) for id, title, author in rows)
+        # indexing runs off the event loop so requests keep being served
+        return await asyncio.to_thread(PrefixIndex.build, books)
+
+    def install(self, index: PrefixIndex) -> None:
+        self.index = index
+        logger.info("Autocomplete index built with %d books", len(index))
+
+    def apply_change(self, change: dict) -> None:
+        if change.get("deleted"):
+            self.index.remove(change["id"])
+        else:
+            self.index.add(change["id"], change["title"], change["author"])
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        return self.index.search(query, limit)
+
+    async def book_saved(self, book: Book) -> None:
+        await self.publish_change(
+            {"id": str(book.id), "title": book.title, "author": book.author}
+        )
+
+    async def book_deleted(self, book_id) -> None:
+        await self.publish_change({"id": str(book_id), "deleted": True})
+
+
+book_autocomplete = BookAutocomplete()
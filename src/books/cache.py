@@ -0,0 +1,208 @@
+"""Serialized book detail responses, cached per worker and in Redis.
+
+A lookup tries this worker's LRU, then Redis, then the database. Writes
+to a book, its reviews or its tags invalidate it everywhere: the Redis
+entry is deleted and a pub/sub message drops it from every worker's LRU.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+from redis.exceptions import RedisError
+from src.auth.utils import RateLimitedLog
+from src.cache import LRUCache
+from src.config import Config
+from src.db.redis import publish, redis_client, subscribe
+
+BOOK_INVALIDATION_CHANNEL = "book_detail_invalidations"
+
+# Redis DEL calls are split so one big invalidation doesn't block Redis
+INVALIDATION_BATCH_SIZE = 1000
+
+cache_failure_log = RateLimitedLog(interval=Config.FAILURE_LOG_INTERVAL)
+
+
+def redis_key(book_id: str) -> str:
+    return f"book_detail:{book_id}"
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    # validators, so conditional requests are answered from the cache too
+    etag: str
+    last_modified: datetime
+
+    def to_redis(self) -> dict:
+        return {
+            "body": self.body,
+            "etag": self.etag,
+            "last_modified": self.last_modified.isoformat(),
+        }
+
+    @classmethod
+    def from_redis(cls, fields: dict) -> Optional["CachedBody"]:
+        if not fields:
+            return None
+        return cls(
+            body=fields[b"body"],
+            etag=fields[b"etag"].decode(),
+            last_modified=datetime.fromisoformat(fields[b"last_modified"].decode()),
+        )
+
+
+class BookDetailCache:
+    """Two-tier cache of response bodies keyed by book id.
+
+    Concurrent misses on one key in a worker share a single load. An entry
+    written to Redis by a load that raced with an invalidation on another
+    worker can outlive it by up to BOOK_CACHE_TTL seconds.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(
+            maxsize=Config.BOOK_CACHE_SIZE, ttl=Config.BOOK_CACHE_LOCAL_TTL
+        )
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.coalesced = 0
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    async def get(
+        self, book_id: str, load: Callable[[], Awaitable[Optional[CachedBody]]]
+    ) -> Optional[CachedBody]:
+        """The cached body for a book, calling load on a miss; None if
+        there is no such book"""
+        entry = self.local.get(book_id)
+        if entry is not None:
+            return entry
+
+        loading = self._loading.get(book_id)
+        if loading is not None:
+            self.coalesced += 1
+            # shielded so one cancelled waiter doesn't cancel the others
+            return await asyncio.shield(loading)
+
+        loading = self._loading[book_id] = asyncio.get_running_loop().create_future()
+        try:
+            entry = await self._fetch(book_id, load)
+        except BaseException as e:
+            loading.set_exception(e)
+            # waiters, if there are any, get the error raised below too
+            loading.exception()
+            raise
+        else:
+            loading.set_result(entry)
+        finally:
+            del self._loading[book_id]
+        return entry
+
+    async def preload(
+        self,
+        book_ids: List[str],
+        load_many: Callable[[List[str]], Awaitable[Dict[str, CachedBody]]],
+    ) -> None:
+        """Bring entries into this worker's LRU, loading the ones missing
+        from Redis with a single call"""
+        generation = self.local.generation
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for book_id in book_ids:
+                    pipe.hgetall(redis_key(book_id))
+                found = await pipe.execute()
+        except RedisError as e:
+            cache_failure_log.warning("Book cache read failed: %s", e)
+            found = [{}] * len(book_ids)
+
+        entries = {}
+        for book_id, fields in zip(book_ids, found):
+            entry = CachedBody.from_redis(fields)
+            if entry is not None:
+                entries[book_id] = entry
+        missing = [book_id for book_id in book_ids if book_id not in entries]
+        loaded = await load_many(missing) if missing else {}
+
+        if generation != self.local.generation:
+            return
+        if loaded:
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for book_id, entry in loaded.items():
+                        pipe.hset(redis_key(book_id), mapping=entry.to_redis())
+                        pipe.expire(redis_key(book_id), Config.BOOK_CACHE_TTL)
+                    await pipe.execute()
+            except RedisError as e:
+                cache_failure_log.warning("Book cache write failed: %s", e)
+        for book_id, entry in {**entries, **loaded}.items():
+            self.local.set(book_id, entry)
+
+    async def _fetch(self, book_id: str, load) -> Optional[CachedBody]:
+        generation = self.local.generation
+        key = redis_key(book_id)
+        try:
+            entry = CachedBody.from_redis(await redis_client.hgetall(key))
+        except RedisError as e:
+            cache_failure_log.warning("Book cache read failed: %s", e)
+            entry = None
+
+        if entry is not None:
+            self.redis_hits += 1
+        else:
+            self.redis_misses += 1
+            entry = await load()
+            if entry is None:
+                return None
+            if generation == self.local.generation:
+                try:
+                    async with redis_client.pipeline(transaction=True) as pipe:
+                        pipe.hset(key, mapping=entry.to_redis())
+                        pipe.expire(key, Config.BOOK_CACHE_TTL)
+                        await pipe.execute()
+                except RedisError as e:
+                    cache_failure_log.warning("Book cache write failed: %s", e)
+
+        # an invalidation that arrived while loading means it may be stale
+        if generation == self.local.generation:
+            self.local.set(book_id, entry)
+        return entry
+
+    def drop(self, message: str) -> None:
+        for book_id in message.split(","):
+            self.local.delete(book_id)
+
+    async def invalidate(self, book_ids: Iterable) -> None:
+        book_ids = list(dict.fromkeys(str(book_id) for book_id in book_ids))
+        for book_id in book_ids:
+            self.local.delete(book_id)
+        for start in range(0, len(book_ids), INVALIDATION_BATCH_SIZE):
+            batch = book_ids[start : start + INVALIDATION_BATCH_SIZE]
+            try:
+                await redis_client.delete(*map(redis_key, batch))
+            except RedisError as e:
+                cache_failure_log.warning("Book cache invalidation failed: %s", e)
+            await publish(BOOK_INVALIDATION_CHANNEL, ",".join(batch))
+
+    def stats(self) -> dict:
+        redis_lookups = self.redis_hits + self.redis_misses
+        return {
+            "local": {
+                **self.local.stats(),
+                "bytes": sum(len(entry.body) for entry in self.local.values()),
+            },
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "hit_ratio": (
+                    self.redis_hits / redis_lookups if redis_lookups else 0.0
+                ),
+            },
+            "coalesced_misses": self.coalesced,
+        }
+
+
+book_detail_cache = BookDetailCache()
+
+subscribe(
+    BOOK_INVALIDATION_CHANNEL,
+    book_detail_cache.drop,
+    on_resync=book_detail_cache.local.clear,
+)
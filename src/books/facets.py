@@ -0,0 +1,304 @@
+import asyncio
+import bisect
+import heapq
+import logging
+from array import array
+from datetime import datetime, timedelta
+from functools import reduce
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlmodel import select
+from src.config import Config
+from src.db.main import async_session_maker
+from src.db.models import Book, BookTag, Tag
+from src.db.redis import MirroredIndex
+
+logger = logging.getLogger(__name__)
+
+TAG_CHANGES_CHANNEL = "tag_changes"
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(created_at: datetime) -> int:
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+class TagBitmap:
+    """One bitset per tag over dense book ordinals.
+
+    Ordinals are handed out in (created_at, id) order, the order the
+    catalog is listed in, so a page of a tag query is just the highest set
+    bits below the cursor. Each bitset is a Python int, which makes AND,
+    OR and popcount single C-level operations over the whole catalog.
+
+    A book created elsewhere can arrive out of order. It and every book
+    added after it are kept in a separate list sorted by key, merged into
+    results, until the next rebuild puts them in place.
+    """
+
+    def __init__(self):
+        self._book_ids: List[str] = []
+        self._created: array = array("q")
+        self._ordinals: Dict[str, int] = {}
+        # ordinals below this are in key order; the rest are in _late as
+        # (created_at, id, ordinal), sorted
+        self._sorted_count = 0
+        self._late: List[Tuple[int, str, int]] = []
+        self._tags: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._counts: Dict[str, int] = {}
+        self._popular: Optional[List[str]] = None
+
+    @classmethod
+    def build(
+        cls,
+        books: Iterable[Tuple[str, datetime]],
+        book_tags: Iterable[Tuple[str, str]],
+    ) -> "TagBitmap":
+        """Index books, given oldest first, and their (book_id, tag) pairs"""
+        index = cls()
+        for book_id, created_at in books:
+            index.add_book(book_id, created_at)
+
+        # set bits in byte buffers, then convert each once; OR-ing ints
+        # together one book at a time would copy the whole bitset every time
+        size = len(index._book_ids) // 8 + 1
+        buffers: Dict[str, bytearray] = {}
+        for book_id, name in book_tags:
+            ordinal = index._ordinals.get(book_id)
+            if ordinal is None:
+                continue
+            key = index._tag_key(name)
+            if key not in buffers:
+                buffers[key] = bytearray(size)
+                index._names[key] = name
+            buffers[key][ordinal >> 3] |= 1 << (ordinal & 7)
+
+        for key, buffer in buffers.items():
+            bits = index._tags[key] = int.from_bytes(buffer, "little")
+            index._counts[key] = bits.bit_count()
+        return index
+
+    @staticmethod
+    def _tag_key(name: str) -> str:
+        return name.strip().casefold()
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add_book(self, book_id: str, created_at: datetime) -> int:
+        ordinal = self._ordinals.get(book_id)
+        if ordinal is None:
+            ordinal = self._ordinals[book_id] = len(self._book_ids)
+            key = (to_micros(created_at), book_id)
+            if self._sorted_count == ordinal and (
+                not ordinal or key > self._key(ordinal - 1)
+            ):
+                self._sorted_count += 1
+            else:
+                bisect.insort(self._late, (*key, ordinal))
+            self._book_ids.append(book_id)
+            self._created.append(key[0])
+        return ordinal
+
+    def _key(self, ordinal: int) -> Tuple[int, str]:
+        return self._created[ordinal], self._book_ids[ordinal]
+
+    def tag_book(self, book_id: str, created_at: datetime, names: List[str]) -> None:
+        bit = 1 << self.add_book(book_id, created_at)
+        for name in names:
+            key = self._tag_key(name)
+            bits = self._tags.get(key, 0)
+            if not bits & bit:
+                self._tags[key] = bits | bit
+                self._counts[key] = self._counts.get(key, 0) + 1
+                self._names.setdefault(key, name)
+                self._popular = None
+
+    def remove_book(self, book_id: str) -> None:
+        # the ordinal is left unused until the next rebuild
+        ordinal = self._ordinals.pop(book_id, None)
+        if ordinal is None:
+            return
+        bit = 1 << ordinal
+        for key, bits in self._tags.items():
+            if bits & bit:
+                self._tags[key] = bits ^ bit
+                self._counts[key] -= 1
+        self._popular = None
+
+    def remove_tag(self, name: str) -> None:
+        key = self._tag_key(name)
+        self._tags.pop(key, None)
+        self._names.pop(key, None)
+        self._counts.pop(key, None)
+        self._popular = None
+
+    def rename_tag(self, old_name: str, new_name: str) -> None:
+        old_key, new_key = self._tag_key(old_name), self._tag_key(new_name)
+        bits = self._tags.pop(old_key, 0)
+        self._names.pop(old_key, None)
+        self._counts.pop(old_key, None)
+        if bits:
+            bits |= self._tags.get(new_key, 0)
+            self._tags[new_key] = bits
+            self._counts[new_key] = bits.bit_count()
+            self._names[new_key] = new_name
+        self._popular = None
+
+    def popular_tags(self) -> List[str]:
+        if self._popular is None:
+            self._popular = heapq.nlargest(
+                Config.TAG_FACET_CANDIDATES, self._counts, key=self._counts.get
+            )
+        return self._popular
+
+    def _ordinals_before(self, created_at: datetime, book_id: str) -> int:
+        """Number of in-order ordinals whose (created_at, id) sorts before
+        the key"""
+        return bisect.bisect_left(
+            range(self._sorted_count), (to_micros(created_at), book_id), key=self._key
+        )
+
+    def _late_before(self, matches: int, before) -> Iterator[int]:
+        """Out-of-order ordinals in matches and before the key, newest first"""
+        end = len(self._late)
+        if before is not None:
+            end = bisect.bisect_left(self._late, (to_micros(before[0]), before[1]))
+        for index in range(end - 1, -1, -1):
+            ordinal = self._late[index][2]
+            if matches >> ordinal & 1:
+                yield ordinal
+
+    def _datetime_key(self, ordinal: int) -> Tuple[datetime, str]:
+        created_at = EPOCH + timedelta(microseconds=self._created[ordinal])
+        return created_at, self._book_ids[ordinal]
+
+    def search(
+        self,
+        names: List[str],
+        mode: str,
+        limit: int,
+        before: Optional[Tuple[datetime, str]] = None,
+    ) -> Tuple[List[str], Optional[Tuple[datetime, str]], List[dict]]:
+        """Newest books matching all or any of the tags, the key to pass as
+        before for the next page (None on the last one), and per-tag counts
+        within the matching books"""
+        keys = list(dict.fromkeys(map(self._tag_key, names)))
+        bitsets = [self._tags.get(key, 0) for key in keys]
+        if mode == "all":
+            matches = reduce(int.__and__, bitsets) if bitsets else 0
+        else:
+            matches = reduce(int.__or__, bitsets, 0)
+
+        facets = []
+        # a popcount walks the whole bitset, so only the most used tags are
+        # counted rather than every tag in the catalog
+        for key in self.popular_tags():
+            if key in keys:
+                continue
+            count = (matches & self._tags[key]).bit_count()
+            if count:
+                facets.append({"name": self._names[key], "count": count})
+        facets.sort(key=lambda facet: (-facet["count"], facet["name"]))
+
+        remaining = matches & ((1 << self._sorted_count) - 1)
+        if before is not None:
+            remaining &= (1 << self._ordinals_before(*before)) - 1
+
+        ordinals = []
+        while remaining and len(ordinals) <= limit:
+            ordinal = remaining.bit_length() - 1
+            ordinals.append(ordinal)
+            remaining ^= 1 << ordinal
+        if self._late:
+            late = self._late_before(matches, before)
+            merged = heapq.merge(ordinals, late, key=self._key, reverse=True)
+            ordinals = list(islice(merged, limit + 1))
+
+        book_ids = [self._book_ids[ordinal] for ordinal in ordinals[:limit]]
+        # taken now: the book may be gone from the index by the time the
+        # caller has loaded the page
+        next_key = None
+        if len(ordinals) > limit:
+            next_key = self._datetime_key(ordinals[limit - 1])
+        return book_ids, next_key, facets[: Config.TAG_FACET_LIMIT]
+
+
+class BookTagIndex(MirroredIndex):
+    """Keeps this worker's TagBitmap in step with the books and booktag tables"""
+
+    name = "tag bitmap index"
+
+    def __init__(self):
+        super().__init__(TAG_CHANGES_CHANNEL)
+        self.index = TagBitmap()
+
+    async def load(self) -> TagBitmap:
+        async with async_session_maker() as session:
+            books = await session.exec(
+                select(Book.id, Book.created_at).order_by(Book.created_at, Book.id)
+            )
+            book_tags = await session.exec(
+                select(BookTag.book_id, Tag.name).join(Tag, Tag.id == BookTag.tag_id)
+            )
+            books = [(str(id), created_at) for id, created_at in books.all()]
+            book_tags = [(str(book_id), name) for book_id, name in book_tags.all()]
+        # indexing runs off the event loop so requests keep being served
+        return await asyncio.to_thread(TagBitmap.build, books, book_tags)
+
+    def install(self, index: TagBitmap) -> None:
+        self.index = index
+        logger.info("Tag bitmap index built with %d books", len(index))
+
+    def apply_change(self, change: dict) -> None:
+        op = change["op"]
+        if op == "add_book":
+            self.index.add_book(
+                change["id"], datetime.fromisoformat(change["created_at"])
+            )
+        elif op == "tag_book":
+            self.index.tag_book(
+                change["id"],
+                datetime.fromisoformat(change["created_at"]),
+                change["tags"],
+            )
+        elif op == "remove_book":
+            self.index.remove_book(change["id"])
+        elif op == "remove_tag":
+            self.index.remove_tag(change["name"])
+        elif op == "rename_tag":
+            self.index.rename_tag(change["old_name"], change["new_name"])
+
+    def search(self, names, mode, limit, before=None):
+        return self.index.search(names, mode, limit, before)
+
+    async def book_created(self, book: Book) -> None:
+        await self.publish_change(
+            {"op": "add_book", "id": str(book.id), "created_at": book.created_at}
+        )
+
+    async def book_tagged(self, book: Book, names: List[str]) -> None:
+        await self.publish_change(
+            {
+                "op": "tag_book",
+                "id": str(book.id),
+                "created_at": book.created_at,
+                "tags": names,
+            }
+        )
+
+    async def book_deleted(self, book_id) -> None:
+        await self.publish_change({"op": "remove_book", "id": str(book_id)})
+
+    async def tag_deleted(self, name: str) -> None:
+        await self.publish_change({"op": "remove_tag", "name": name})
+
+    async def tag_renamed(self, old_name: str, new_name: str) -> None:
+        await self.publish_change(
+            {"op": "rename_tag", "old_name": old_name, "new_name": new_name}
+        )
+
+
+book_tag_index = BookTagIndex()
@@ -0,0 +1,237 @@
+"""Top-rated and most-reviewed books, kept in Redis sorted sets.
+
+Every review write bumps a per-day bucket and an all-time set. Windowed
+leaderboards are the union of the day buckets they span, computed on
+read and kept for a short while. Rebuild everything from Postgres with
+
+    python -m src.books.leaderboard
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from src.config import Config
+from src.db.main import async_session_maker
+from src.db.models import Book, Review
+from src.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = {"7d": 7, "30d": 30}
+# a day bucket is only read while it is inside the longest window
+DAY_BUCKET_TTL = (max(WINDOW_DAYS.values()) + 1) * 86400
+AVG_RATING_KEY = "leaderboard:avg_rating:all"
+
+# per book: add to the review count and rating sum of a day bucket and of
+# the all-time totals, then refresh the book's all-time average
+RECORD_SCRIPT = redis_client.register_script(
+    """
+    local function bump(count_key, sum_key)
+        local count = tonumber(redis.call('ZINCRBY', count_key, ARGV[2], ARGV[1]))
+        local total = tonumber(redis.call('ZINCRBY', sum_key, ARGV[3], ARGV[1]))
+        if count <= 0 then
+            redis.call('ZREM', count_key, ARGV[1])
+            redis.call('ZREM', sum_key, ARGV[1])
+        end
+        return count, total
+    end
+
+    bump(KEYS[1], KEYS[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+
+    local count, total = bump(KEYS[3], KEYS[4])
+    if count >= tonumber(ARGV[4]) then
+        redis.call('ZADD', KEYS[5], total / count, ARGV[1])
+    else
+        redis.call('ZREM', KEYS[5], ARGV[1])
+    end
+    """
+)
+
+# average ratings over a window, for books with enough reviews: merges
+# the day buckets' counts (KEYS[4..]) and sums (the last ARGV[1] keys) into
+# scratch sets (KEYS[2], KEYS[3]) and writes the averages to KEYS[1]. One
+# script, so concurrent cold reads can't see or clobber each other's
+# half-built sets.
+MERGE_RATINGS_SCRIPT = redis_client.register_script(
+    """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        return
+    end
+    local days = tonumber(ARGV[1])
+    local counts_key, sums_key = KEYS[2], KEYS[3]
+    redis.call('ZUNIONSTORE', counts_key, days, unpack(KEYS, 4, 3 + days))
+    redis.call('ZUNIONSTORE', sums_key, days, unpack(KEYS, 4 + days, 3 + 2 * days))
+
+    local min_reviews = ARGV[2]
+    local counts = redis.call(
+        'ZRANGEBYSCORE', counts_key, min_reviews, '+inf', 'WITHSCORES'
+    )
+    for i = 1, #counts, 2 do
+        local total = tonumber(redis.call('ZSCORE', sums_key, counts[i]))
+        redis.call('ZADD', KEYS[1], total / tonumber(counts[i + 1]), counts[i])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('DEL', counts_key, sums_key)
+    """
+)
+
+
+def count_key(bucket: str) -> str:
+    return f"leaderboard:reviews:{bucket}"
+
+
+def sum_key(bucket: str) -> str:
+    return f"leaderboard:rating_sum:{bucket}"
+
+
+def day_bucket(day: date) -> str:
+    return day.strftime("%Y%m%d")
+
+
+def window_buckets(window: str) -> List[str]:
+    today = datetime.now().date()
+    return [day_bucket(today - timedelta(days=n)) for n in range(WINDOW_DAYS[window])]
+
+
+async def record_review(
+    book_id, count_delta: int, rating_delta: int, reviewed_at: datetime
+) -> None:
+    """Apply a review change to the leaderboards.
+
+    A review is counted on the day it was written, so edits and deletes
+    later on adjust that day's bucket. Failures are only logged; the
+    leaderboards can be rebuilt from Postgres.
+    """
+    bucket = day_bucket(reviewed_at.date())
+    try:
+        await RECORD_SCRIPT(
+            keys=[
+                count_key(bucket),
+                sum_key(bucket),
+                count_key("all"),
+                sum_key("all"),
+                AVG_RATING_KEY,
+            ],
+            args=[
+                str(book_id),
+                count_delta,
+                rating_delta,
+                Config.LEADERBOARD_MIN_REVIEWS,
+                DAY_BUCKET_TTL,
+            ],
+        )
+    except RedisError as e:
+        logger.warning("Could not update leaderboards for book %s: %s", book_id, e)
+
+
+async def merged_key(by: str, window: str) -> str:
+    """Key of the leaderboard for a window, merging day buckets if needed"""
+    if window == "all":
+        return count_key("all") if by == "reviews" else AVG_RATING_KEY
+
+    buckets = window_buckets(window)
+    dest = f"leaderboard:{by}:{window}:{buckets[0]}"
+    if await redis_client.exists(dest):
+        return dest
+
+    counts = [count_key(bucket) for bucket in buckets]
+    if by == "reviews":
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(dest, counts)
+            pipe.expire(dest, Config.LEADERBOARD_MERGE_TTL)
+            await pipe.execute()
+    else:
+        await MERGE_RATINGS_SCRIPT(
+            keys=[
+                dest,
+                f"{dest}:counts",
+                f"{dest}:sums",
+                *counts,
+                *(sum_key(bucket) for bucket in buckets),
+            ],
+            args=[
+                len(buckets),
+                Config.LEADERBOARD_MIN_REVIEWS,
+                Config.LEADERBOARD_MERGE_TTL,
+            ],
+        )
+    return dest
+
+
+async def top_books(by: str, window: str, limit: int) -> List[Tuple[str, float]]:
+    key = await merged_key(by, window)
+    entries = await redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+    return [(member.decode(), score) for member, score in entries]
+
+
+async def rebuild() -> None:
+    """Recompute every leaderboard from Postgres.
+
+    The sets are written under temporary names and renamed into place, so
+    readers never see a half-built leaderboard. Review writes made while
+    the rebuild runs can be lost from it.
+    """
+    oldest_day = datetime.now().date() - timedelta(days=max(WINDOW_DAYS.values()))
+    day = func.date_trunc("day", Review.created_at)
+    days_statement = (
+        select(
+            Review.book_id, day, func.count(Review.id), func.sum(Review.rating)
+        )
+        .where(Review.created_at >= oldest_day, Review.book_id.is_not(None))
+        .group_by(Review.book_id, day)
+    )
+    # all-time totals come from the aggregates kept on books
+    totals_statement = select(Book.id, Book.review_count, Book.rating_sum).where(
+        Book.review_count > 0
+    )
+
+    staged = {}
+    day_keys = set()
+
+    def stage(key: str) -> str:
+        staged.setdefault(key, f"leaderboard-rebuild:{key}")
+        return staged[key]
+
+    async with async_session_maker() as session:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            rows = await session.stream(days_statement)
+            async for book_id, reviewed_on, count, total in rows:
+                bucket = day_bucket(reviewed_on.date())
+                day_keys.update((count_key(bucket), sum_key(bucket)))
+                pipe.zadd(stage(count_key(bucket)), {str(book_id): count})
+                pipe.zadd(stage(sum_key(bucket)), {str(book_id): total})
+                if len(pipe) >= 10000:
+                    await pipe.execute()
+
+            rows = await session.stream(totals_statement)
+            async for book_id, count, total in rows:
+                pipe.zadd(stage(count_key("all")), {str(book_id): count})
+                pipe.zadd(stage(sum_key("all")), {str(book_id): total})
+                if count >= Config.LEADERBOARD_MIN_REVIEWS:
+                    pipe.zadd(stage(AVG_RATING_KEY), {str(book_id): total / count})
+                if len(pipe) >= 10000:
+                    await pipe.execute()
+            await pipe.execute()
+
+    old_keys = [key async for key in redis_client.scan_iter(match="leaderboard:*")]
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for key in old_keys:
+            if key.decode() not in staged:
+                pipe.unlink(key)
+        for key, staged_key in staged.items():
+            pipe.rename(staged_key, key)
+            if key in day_keys:
+                pipe.expire(key, DAY_BUCKET_TTL)
+        await pipe.execute()
+
+    logger.info("Rebuilt %d leaderboard sets", len(staged))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild())
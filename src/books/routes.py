@@ -1,49 +1,143 @@
-from fastapi import APIRouter, status, Depends
-from typing import List
-from src.books.schemas import BookCreateModel, BookReviewDetailModel, BookUpdateModel
+from fastapi import APIRouter, Query, Request, Response, status, Depends
+from typing import List, Literal, Optional
+from src.books.autocomplete import book_autocomplete
+from src.books.leaderboard import top_books
+from src.books.schemas import (
+    BookBatchItem,
+    BookBatchRequest,
+    BookCreateModel,
+    BookPage,
+    BookReviewDetailModel,
+    BookSuggestion,
+    BookUpdateModel,
+    TopBook,
+)
 from src.db.models import Book
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.db.main import get_session
+from src.db.replicas import get_read_session
 from src.books.service import BookService, get_book_service
-from src.auth.dependencies import AccessTokenBearer, RoleChecker
+from src.auth.dependencies import RoleChecker, access_token_bearer
+from src.conditional import is_fresh, not_modified, validators
+from src.config import Config
+from src.edge import private_policy, revalidate_policy
 from src.errors import BookNotFound
 
-book_router = APIRouter()
+book_router = APIRouter(dependencies=[Depends(private_policy)])
 
-access_token_bearer = AccessTokenBearer()
 role_checker = Depends(RoleChecker(["admin", "user"]))
+revalidate = Depends(revalidate_policy)
 
 
 @book_router.get(
     "/",
     status_code=200,
-    response_model=List[Book],
-    dependencies=[role_checker],
+    response_model=BookPage,
+    dependencies=[role_checker, revalidate],
 )
 async def get_all_books(
-    session: AsyncSession = Depends(get_session),
+    limit: int = Query(Config.BOOKS_PAGE_SIZE, ge=1, le=Config.BOOKS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tags: Optional[str] = Query(None, description="Comma-separated tag names"),
+    mode: Literal["all", "any"] = "all",
+    session: AsyncSession = Depends(get_read_session),
     token_details: dict = Depends(access_token_bearer),
     book_service: BookService = Depends(get_book_service),
 ):
-    books = await book_service.get_all_books(session)
-    return books
+    names = [name.strip() for name in (tags or "").split(",") if name.strip()]
+    if names:
+        return await book_service.get_books_by_tags(
+            names, mode, session, limit, cursor
+        )
+    return await book_service.get_all_books(session, limit, cursor)
 
 
 @book_router.get(
     "/user/{user_id}",
     status_code=200,
-    response_model=List[Book],
+    response_model=BookPage,
     dependencies=[role_checker],
 )
 async def get_user_book_submission(
     user_id: str,
-    session: AsyncSession = Depends(get_session),
+    limit: int = Query(Config.BOOKS_PAGE_SIZE, ge=1, le=Config.BOOKS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
     token_details: dict = Depends(access_token_bearer),
     book_service: BookService = Depends(get_book_service),
 ):
     user_id = token_details["user"]["user_id"]
-    books = await book_service.get_user_books(user_id, session)
-    return books
+    return await book_service.get_user_books(user_id, session, limit, cursor)
+
+
+@book_router.get(
+    "/search",
+    status_code=200,
+    response_model=BookPage,
+    dependencies=[role_checker, revalidate],
+)
+async def search_books(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(Config.BOOKS_PAGE_SIZE, ge=1, le=Config.BOOKS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    token_details: dict = Depends(access_token_bearer),
+    book_service: BookService = Depends(get_book_service),
+):
+    return await book_service.search_books(q, session, limit, cursor)
+
+
+@book_router.get(
+    "/autocomplete",
+    status_code=200,
+    response_model=List[BookSuggestion],
+    dependencies=[role_checker, revalidate],
+)
+async def autocomplete_books(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(
+        Config.AUTOCOMPLETE_LIMIT, ge=1, le=Config.AUTOCOMPLETE_LIMIT_MAX
+    ),
+    token_details: dict = Depends(access_token_bearer),
+):
+    # answered from this worker's in-memory index, never the database
+    return book_autocomplete.search(q, limit)
+
+
+@book_router.get(
+    "/top",
+    status_code=200,
+    response_model=List[TopBook],
+    dependencies=[role_checker, revalidate],
+)
+async def get_top_books(
+    by: Literal["rating", "reviews"] = "rating",
+    window: Literal["7d", "30d", "all"] = "all",
+    limit: int = Query(Config.LEADERBOARD_SIZE, ge=1, le=Config.LEADERBOARD_SIZE_MAX),
+    session: AsyncSession = Depends(get_read_session),
+    token_details: dict = Depends(access_token_bearer),
+    book_service: BookService = Depends(get_book_service),
+):
+    # the ranking comes from Redis; Postgres only fills in the books by id
+    ranking = await top_books(by, window, limit)
+    books = await book_service.get_books_by_ids([id for id, _ in ranking], session)
+    scores = dict(ranking)
+    return [{**book.model_dump(), "score": scores[str(book.id)]} for book in books]
+
+
+@book_router.post(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=List[BookBatchItem],
+    dependencies=[role_checker],
+)
+async def get_books_batch(
+    data: BookBatchRequest,
+    session: AsyncSession = Depends(get_read_session),
+    token_details: dict = Depends(access_token_bearer),
+    book_service: BookService = Depends(get_book_service),
+):
+    return await book_service.get_books_batch(data.ids, session)
 
 
 @book_router.post(
@@ -67,21 +161,23 @@ async def create_book(
     "/{id}",
     status_code=status.HTTP_200_OK,
     response_model=BookReviewDetailModel,
-    dependencies=[role_checker],
+    dependencies=[role_checker, revalidate],
 )
 async def get_book(
     id: str,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
     token_details: dict = Depends(access_token_bearer),
     book_service: BookService = Depends(get_book_service),
 ) -> dict:
-    book = await book_service.get_book(id, session)
-
-    if book:
-        return book
-    else:
+    detail = await book_service.get_book_detail(id)
+    if detail is None:
         raise BookNotFound()
 
+    headers = validators(detail.etag, detail.last_modified)
+    if is_fresh(request, detail.etag, detail.last_modified):
+        return not_modified(headers)
+    return Response(content=detail.body, media_type="application/json", headers=headers)
+
 
 @book_router.patch(
     "/{id}",
@@ -1,8 +1,9 @@
 from datetime import datetime, date
-from typing import List
+from typing import List, Optional
 import uuid
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from src.config import Config
 from src.reviews.schemas import ReviewModel
 from src.tags.schemas import TagModel
 
@@ -15,15 +16,51 @@ class Book(BaseModel):
     published_date: date
     page_count: int
     language: str
+    review_count: int
+    rating_sum: int
+    avg_rating: Optional[float] = None
     created_at: datetime
     updated_at: datetime
 
 
+class TagFacet(BaseModel):
+    name: str
+    count: int
+
+
+class BookPage(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+    # only filled in when filtering by tags
+    facets: Optional[List[TagFacet]] = None
+
+
+class TopBook(Book):
+    score: float
+
+
+class BookSuggestion(BaseModel):
+    id: uuid.UUID
+    title: str
+    author: str
+
+
 class BookReviewDetailModel(Book):
     reviews: List[ReviewModel]
     tags: List[TagModel]
 
 
+class BookBatchRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(min_length=1, max_length=Config.BOOKS_BATCH_MAX)
+
+
+class BookBatchItem(BaseModel):
+    id: uuid.UUID
+    book: Optional[BookReviewDetailModel] = None
+    # set instead of book when there is no book with this id
+    error: Optional[str] = None
+
+
 class BookCreateModel(BaseModel):
     title: str
     author: str
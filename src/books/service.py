@@ -1,30 +1,271 @@
+import uuid
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import (
+    bindparam,
+    func,
+    inspect,
+    literal_column,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.db.models import Book
+import sqlalchemy.dialects.postgresql as pg
+from src.config import Config
+from src.db.models import BOOK_SEARCH_CONFIG, Book, Review
 from datetime import datetime
-from src.books.schemas import BookCreateModel, BookUpdateModel
+from src.books.autocomplete import book_autocomplete
+from src.books.cache import CachedBody, book_detail_cache
+from src.books.facets import book_tag_index
+from src.books.schemas import (
+    BookCreateModel,
+    BookReviewDetailModel,
+    BookUpdateModel,
+)
+from src.conditional import weak_etag
+from src.edge import purge
+from src.tags.cache import tag_catalog_cache
+from src.db.loaders import row_loader, uuid_key
+from src.db.main import async_session_maker
+from src.db.pagination import decode_cursor, encode_cursor
+from src.errors import InvalidCursor
+
+# what BookReviewDetailModel renders on top of the book's own columns; its
+# reviews are the newest few, attached by attach_recent_reviews
+BOOK_DETAIL_OPTIONS = (selectinload(Book.tags),)
+
+
+def decode_book_cursor(cursor: str):
+    created_at, id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except (TypeError, ValueError):
+        raise InvalidCursor()
 
 
 class BookService:
 
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Book).order_by(Book.created_at.desc())
+    async def _get_page(
+        self, statement, session: AsyncSession, limit: int, cursor: Optional[str]
+    ):
+        """Newest first, resuming after the (created_at, id) packed in the cursor"""
+        if cursor is not None:
+            key = decode_book_cursor(cursor)
+            statement = statement.where(tuple_(Book.created_at, Book.id) < key)
+
+        # one extra row tells us whether there is another page
+        statement = statement.order_by(Book.created_at.desc(), Book.id.desc()).limit(
+            limit + 1
+        )
         result = await session.exec(statement)
-        return result.all()
+        books = result.all()
+
+        next_cursor = None
+        if len(books) > limit:
+            books = books[:limit]
+            last = books[-1]
+            next_cursor = encode_cursor([last.created_at.isoformat(), str(last.id)])
+
+        return {"items": books, "next_cursor": next_cursor}
+
+    async def get_all_books(
+        self, session: AsyncSession, limit: int, cursor: Optional[str] = None
+    ):
+        return await self._get_page(select(Book), session, limit, cursor)
+
+    async def get_user_books(
+        self, user_id, session: AsyncSession, limit: int, cursor: Optional[str] = None
+    ):
+        statement = select(Book).where(Book.user_id == user_id)
+        return await self._get_page(statement, session, limit, cursor)
+
+    async def get_books_by_tags(
+        self,
+        names,
+        mode: str,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+    ):
+        """Same order and cursors as get_all_books, but the filtering is
+        done by the in-memory tag index and only the page is read from the
+        database"""
+        before = None
+        if cursor is not None:
+            created_at, id = decode_book_cursor(cursor)
+            before = (created_at, str(id))
+
+        ids, next_key, facets = book_tag_index.search(names, mode, limit, before)
+        books = await self.get_books_by_ids(ids, session)
+
+        next_cursor = None
+        if next_key is not None:
+            created_at, id = next_key
+            next_cursor = encode_cursor([created_at.isoformat(), id])
+
+        return {"items": books, "next_cursor": next_cursor, "facets": facets}
+
+    async def search_books(
+        self,
+        query: str,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+    ):
+        """Best matches first, resuming after the (rank, id) packed in the cursor"""
+        search_vector = Book.__table__.c.search_vector
+        # an inline config keeps the expression identical to the stored vector's
+        config = literal_column(f"'{BOOK_SEARCH_CONFIG}'::regconfig")
+        ts_query = func.websearch_to_tsquery(config, query)
+        rank = func.ts_rank(search_vector, ts_query)
+
+        statement = select(Book).where(search_vector.op("@@")(ts_query))
+        if cursor is not None:
+            last_rank, id = decode_cursor(cursor, 2)
+            try:
+                key = (float(last_rank), uuid.UUID(id))
+            except (TypeError, ValueError):
+                raise InvalidCursor()
+            statement = statement.where(tuple_(rank, Book.id) < key)
 
-    async def get_user_books(self, user_id, session: AsyncSession):
         statement = (
-            select(Book).where(Book.user_id == user_id).order_by(Book.created_at.desc())
+            statement.add_columns(rank)
+            .order_by(rank.desc(), Book.id.desc())
+            .limit(limit + 1)
         )
         result = await session.exec(statement)
-        return result.all()
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last, last_rank = rows[-1]
+            next_cursor = encode_cursor([last_rank, str(last.id)])
+
+        return {"items": [book for book, _ in rows], "next_cursor": next_cursor}
+
+    async def get_books_by_ids(
+        self, ids, session: AsyncSession, options=(), with_recent_reviews=False
+    ):
+        """Books with the given ids, in the order the ids were given"""
+        loader = row_loader(session, Book, Book.id, options)
+        books = [book for book in await loader.load_many(ids) if book is not None]
+        if with_recent_reviews:
+            await self.attach_recent_reviews(books, session)
+        return books
 
-    async def get_book(self, id: str, session: AsyncSession):
-        statement = select(Book).where(Book.id == id)
+    async def attach_recent_reviews(self, books, session: AsyncSession) -> None:
+        """Set each book's reviews to its newest BOOK_DETAIL_REVIEWS reviews.
+
+        The rest are paged through GET /reviews/book/{book_id}; a popular
+        book would otherwise render all of its reviews inline.
+        """
+        books = [book for book in books if "reviews" in inspect(book).unloaded]
+        if not books:
+            return
+
+        # one index scan per book, stopping after the newest few
+        ids = bindparam("ids", [book.id for book in books], type_=pg.ARRAY(pg.UUID))
+        wanted = select(func.unnest(ids).label("book_id")).subquery("wanted")
+        recent = (
+            select(Review)
+            .where(Review.book_id == wanted.c.book_id)
+            .order_by(Review.created_at.desc(), Review.id.desc())
+            .limit(Config.BOOK_DETAIL_REVIEWS)
+            .lateral("recent")
+        )
+        statement = (
+            select(aliased(Review, recent)).select_from(wanted).join(recent, true())
+        )
         result = await session.exec(statement)
-        book = result.first()
 
-        return book if book is not None else None
+        reviews = defaultdict(list)
+        for review in result.all():
+            reviews[review.book_id].append(review)
+        for book in books:
+            set_committed_value(book, "reviews", reviews[book.id])
+
+    async def get_books_batch(self, ids, session: AsyncSession):
+        """One entry per distinct id, with the same detail as get_book, or
+        an error for ids that don't match a book"""
+        ids = list(dict.fromkeys(ids))
+        books = await self.get_books_by_ids(
+            ids, session, BOOK_DETAIL_OPTIONS, with_recent_reviews=True
+        )
+        found = {book.id: book for book in books}
+        return [
+            {"id": id, "book": found[id]}
+            if id in found
+            else {"id": id, "error": "book_not_found"}
+            for id in ids
+        ]
+
+    async def get_book(
+        self,
+        id: str,
+        session: AsyncSession,
+        options=BOOK_DETAIL_OPTIONS,
+        with_recent_reviews=True,
+    ):
+        """A book, by default with everything BookReviewDetailModel shows;
+        callers that pass their own options say whether reviews are wanted"""
+        book = await row_loader(session, Book, Book.id, options).load(id)
+        if book is not None and with_recent_reviews:
+            await self.attach_recent_reviews([book], session)
+        return book
+
+    async def get_book_detail(self, id: str):
+        """The serialized BookReviewDetailModel of a book with its
+        validators, or None if there is no such book, served from the book
+        detail cache when possible"""
+        book_id = uuid_key(id)
+        if book_id is None:
+            return None
+
+        async def load():
+            # from the primary: a lagging replica could return the version
+            # an invalidation just dropped, and every worker would then be
+            # served it from Redis for BOOK_CACHE_TTL
+            async with async_session_maker() as session:
+                book = await self.get_book(book_id, session)
+                return self._detail_entry(book) if book is not None else None
+
+        return await book_detail_cache.get(str(book_id), load)
+
+    async def preload_book_details(self, ids, session: AsyncSession) -> None:
+        """Fill the book detail cache for the given books, loading the ones
+        Redis doesn't have with one query each for books, tags and reviews"""
+
+        async def load_many(ids):
+            books = await self.get_books_by_ids(
+                ids, session, BOOK_DETAIL_OPTIONS, with_recent_reviews=True
+            )
+            return {str(book.id): self._detail_entry(book) for book in books}
+
+        await book_detail_cache.preload([str(id) for id in ids], load_many)
+
+    @staticmethod
+    def _detail_entry(book: Book) -> CachedBody:
+        detail = BookReviewDetailModel.model_validate(book, from_attributes=True)
+        body = detail.model_dump_json().encode()
+        # updated_at is bumped by review and tag changes too, but the body
+        # is what the client holds, so the ETag comes from that
+        return CachedBody(body, weak_etag(body), book.updated_at)
+
+    async def touch_books(self, session: AsyncSession, *criteria) -> None:
+        """Bump updated_at on the matching books, for changes to reviews or
+        tags that show up in their detail"""
+        statement = (
+            update(Book)
+            .where(*criteria)
+            .values(updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        await session.exec(statement)
 
     async def create_book(
         self, data: BookCreateModel, user_id: str, session: AsyncSession
@@ -40,11 +281,15 @@ class BookService:
         new_book.user_id = user_id
         session.add(new_book)
         await session.commit()
+        await book_autocomplete.book_saved(new_book)
+        await book_tag_index.book_created(new_book)
 
         return new_book
 
     async def update_book(self, id: str, data: BookUpdateModel, session: AsyncSession):
-        book_to_update = await self.get_book(id, session)
+        book_to_update = await self.get_book(
+            id, session, options=(), with_recent_reviews=False
+        )
         book_update_dict = data.model_dump()
 
         if book_to_update is not None:
@@ -52,16 +297,31 @@ class BookService:
                 setattr(book_to_update, key, value)
 
             await session.commit()
+            await book_detail_cache.invalidate([book_to_update.id])
+            await book_autocomplete.book_saved(book_to_update)
 
             return book_to_update
         else:
             return None
 
     async def delete_book(self, id: str, session: AsyncSession):
-        book_to_delete = await self.get_book(id, session)
+        # every review and tag link has to be loaded for the ORM to unlink them
+        book_to_delete = await self.get_book(
+            id,
+            session,
+            options=(selectinload(Book.reviews), selectinload(Book.tags)),
+            with_recent_reviews=False,
+        )
         if book_to_delete:
             await session.delete(book_to_delete)
             await session.commit()
+            await book_detail_cache.invalidate([book_to_delete.id])
+            # the book no longer counts towards its tags
+            await tag_catalog_cache.bump()
+            # its review pages are cached at the edge
+            await purge(f"book:{book_to_delete.id}")
+            await book_autocomplete.book_deleted(book_to_delete.id)
+            await book_tag_index.book_deleted(book_to_delete.id)
             return True
 
         return False
@@ -0,0 +1,95 @@
+"""Validators and conditional GET handling.
+
+Handlers that can tell a resource's version cheaply answer conditional
+requests themselves, before loading it. Every other GET gets a weak ETag
+hashed from its body by the middleware, which still saves the transfer
+when the client's copy is current.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import FastAPI, Request, Response
+
+# headers a 304 repeats from the response it stands for
+NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "vary", "expires")
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x1f")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    # naive timestamps are written with datetime.now, so they are local time
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validators(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_fresh(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Whether the client's cached copy matches, so a 304 can be sent"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is sent; GET uses
+        # the weak comparison, so W/ prefixes don't matter
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    return modified <= since
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(
+        status_code=304,
+        headers={
+            name: value
+            for name, value in headers.items()
+            if name.lower() in NOT_MODIFIED_HEADERS
+        },
+    )
+
+
+def register_conditional_get(app: FastAPI) -> None:
+    @app.middleware("http")
+    async def conditional_get(request: Request, call_next):
+        response = await call_next(request)
+        if (
+            request.method != "GET"
+            or response.status_code != 200
+            or "etag" in response.headers
+        ):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name != "content-length"
+        }
+        headers["etag"] = weak_etag(body)
+        if is_fresh(request, headers["etag"]):
+            return not_modified(headers)
+        return Response(content=body, status_code=200, headers=headers)
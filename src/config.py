@@ -20,6 +20,61 @@ class Settings(BaseSettings):
     USE_CREDENTIALS: bool
     VALIDATE_CERTS: bool
     DOMAIN: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+    REDIS_POOL_WARMUP_CONNECTIONS: int = 5
+    # book details to load into the cache at startup, taken from the
+    # most-reviewed-this-week leaderboard
+    WARMUP_HOT_BOOKS: int = 100
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
+    REPLICA_HEALTH_CHECK_TIMEOUT: float = 1.0
+    READ_YOUR_WRITES_SECONDS: int = 10
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 60.0
+    TOKEN_CACHE_SIZE: int = 10000
+    FAILURE_LOG_INTERVAL: float = 10.0
+    BLOCKLIST_FILTER_CAPACITY: int = 100000
+    BLOCKLIST_FILTER_ERROR_RATE: float = 0.001
+    BLOCKLIST_REBUILD_INTERVAL: float = 3600.0
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0
+    LOGIN_IP_LIMIT: int = 20
+    LOGIN_IP_WINDOW: int = 60
+    LOGIN_ACCOUNT_LIMIT: int = 5
+    LOGIN_ACCOUNT_WINDOW: int = 300
+    LOGIN_THROTTLE_LOCAL_KEYS: int = 100000
+    BOOKS_PAGE_SIZE: int = 20
+    BOOKS_PAGE_SIZE_MAX: int = 100
+    BOOKS_BATCH_MAX: int = 100
+    BOOK_DETAIL_REVIEWS: int = 10
+    BOOK_CACHE_SIZE: int = 10000
+    BOOK_CACHE_LOCAL_TTL: float = 30.0
+    BOOK_CACHE_TTL: int = 300
+    REVIEWS_PAGE_SIZE: int = 20
+    REVIEWS_PAGE_SIZE_MAX: int = 100
+    AUTOCOMPLETE_LIMIT: int = 10
+    AUTOCOMPLETE_LIMIT_MAX: int = 25
+    AUTOCOMPLETE_MIN_SIMILARITY: float = 0.25
+    AUTOCOMPLETE_FUZZY_TERMS: int = 5
+    AUTOCOMPLETE_BUILD_BATCH_SIZE: int = 10000
+    LEADERBOARD_SIZE: int = 10
+    LEADERBOARD_SIZE_MAX: int = 100
+    LEADERBOARD_MIN_REVIEWS: int = 3
+    LEADERBOARD_MERGE_TTL: int = 60
+    TAG_FACET_LIMIT: int = 20
+    TAG_FACET_CANDIDATES: int = 100
+    TAG_CACHE_TTL: float = 30.0
+    # seconds the CDN may serve a public response before asking again
+    EDGE_DETAIL_TTL: int = 300
+    # file purges are appended to when no CDN purger is configured
+    CDN_PURGE_LOG: str = ""
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
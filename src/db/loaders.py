@@ -0,0 +1,165 @@
+"""Request-scoped batching of lookups by key.
+
+Each session carries its own LoaderRegistry in session.info, and a session
+lives for one request, so results are shared by every dependency and
+service call handling that request and dropped with it. All load() calls
+made in the same event loop tick are answered by one query per loader,
+and repeated loads of a key are served from memory until the session
+commits or rolls back.
+"""
+
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+from sqlalchemy import any_, bindparam, event
+from sqlalchemy.orm import Session
+from sqlmodel import select
+import sqlalchemy.dialects.postgresql as pg
+
+BatchLoad = Callable[[List[Any]], Awaitable[Dict[Any, Any]]]
+
+
+def uuid_key(value) -> Optional[uuid.UUID]:
+    """Ids arrive as strings from paths and tokens; a malformed one can't
+    match any row, so it is answered without a query"""
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class DataLoader:
+    """Collects keys and resolves them with one call to batch_load.
+
+    batch_load gets the distinct keys of a batch and returns a dict of the
+    ones it found; missing keys resolve to None.
+    """
+
+    def __init__(
+        self,
+        registry: "LoaderRegistry",
+        batch_load: BatchLoad,
+        key: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        self._registry = registry
+        self._batch_load = batch_load
+        self._key = key
+        self._results: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[tuple] = []
+
+    def load(self, key) -> asyncio.Future:
+        if self._key is not None:
+            key = self._key(key)
+        future = self._results.get(key)
+        # a caller that was cancelled while waiting cancels the shared future
+        if future is None or future.cancelled():
+            future = asyncio.get_running_loop().create_future()
+            self._results[key] = future
+            if key is None:
+                future.set_result(None)
+            else:
+                self._queue.append((key, future))
+                self._registry.schedule()
+        return future
+
+    async def load_many(self, keys) -> List[Any]:
+        return list(await asyncio.gather(*map(self.load, keys)))
+
+    def clear(self) -> None:
+        self._results.clear()
+
+    async def dispatch(self) -> None:
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
+        try:
+            found = await self._batch_load([key for key, _ in queue])
+        except Exception as e:
+            for key, future in queue:
+                if self._results.get(key) is future:
+                    del self._results[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in queue:
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class LoaderRegistry:
+    """The loaders of one session, flushed together once per loop tick"""
+
+    def __init__(self):
+        self._loaders: Dict[Hashable, DataLoader] = {}
+        self._scheduled = False
+        self._flushes: Set[asyncio.Task] = set()
+        # a session can only run one statement at a time
+        self._lock = asyncio.Lock()
+
+    def get(
+        self,
+        name: Hashable,
+        batch_load: BatchLoad,
+        key: Optional[Callable[[Any], Hashable]] = None,
+    ) -> DataLoader:
+        loader = self._loaders.get(name)
+        if loader is None:
+            loader = self._loaders[name] = DataLoader(self, batch_load, key)
+        return loader
+
+    def schedule(self) -> None:
+        if not self._scheduled:
+            self._scheduled = True
+            # run after every task that is ready now has had its turn, so
+            # their loads land in the same batch
+            asyncio.get_running_loop().call_soon(self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._scheduled = False
+        # the loop only keeps weak references to tasks
+        task = asyncio.ensure_future(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        async with self._lock:
+            for loader in list(self._loaders.values()):
+                await loader.dispatch()
+
+    def clear(self) -> None:
+        for loader in self._loaders.values():
+            loader.clear()
+
+
+def loaders_for(session) -> LoaderRegistry:
+    """The loader registry of a session, created on first use"""
+    registry = session.info.get("loaders")
+    if registry is None:
+        registry = session.info["loaders"] = LoaderRegistry()
+    return registry
+
+
+def row_loader(session, model, column, options=(), key=uuid_key) -> DataLoader:
+    """Loader of model rows by the value of a unique column"""
+
+    async def load_rows(keys):
+        # one array parameter keeps the statement text the same for any
+        # number of keys, unlike an IN list
+        keys_param = bindparam("keys", keys, type_=pg.ARRAY(column.type))
+        statement = select(model).where(column == any_(keys_param)).options(*options)
+        result = await session.exec(statement)
+        return {getattr(row, column.key): row for row in result.all()}
+
+    return loaders_for(session).get((model, column.key, options), load_rows, key)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_loaders(session) -> None:
+    # remembered results, including misses, may be out of date now
+    registry = session.info.get("loaders")
+    if registry is not None:
+        registry.clear()
@@ -1,11 +1,91 @@
-from sqlmodel import SQLModel, create_engine
-from sqlalchemy.ext.asyncio import AsyncEngine
+import asyncio
+import logging
+import time
+from fastapi import Request
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.config import Config
+from src.db.redis import pin_user_to_primary
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
 
+logger = logging.getLogger(__name__)
 
-async_engine = AsyncEngine(create_engine(url=Config.DATABASE_URL, future=True))
+
+class PoolStats:
+    """Running counters for connection checkouts on a pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record_wait(self, wait_time: float) -> None:
+        self.checkouts += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_wait(time.perf_counter() - start_time)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def create_engine_from_url(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url=url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
+    )
+
+
+class TrackedSession(Session):
+    """Session that remembers whether it has flushed any changes"""
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _mark_session_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+
+def create_session_maker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        sync_session_class=TrackedSession,
+        expire_on_commit=False,
+    )
+
+
+async_engine = create_engine_from_url(Config.DATABASE_URL)
+
+async_session_maker = create_session_maker(async_engine)
 
 
 async def init_db():
@@ -15,10 +95,48 @@ async def init_db():
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
-async def get_session() -> AsyncSession:  # type: ignore
-    Session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
+async def warm_up_pool(engine: AsyncEngine = async_engine) -> None:
+    """Open connections up front so the first requests don't pay for them"""
+    count = min(Config.DB_POOL_WARMUP_CONNECTIONS, Config.DB_POOL_SIZE)
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
 
-    async with Session() as session:
+    await asyncio.gather(*(ping() for _ in range(count)))
+
+
+def get_pool_stats(engine: AsyncEngine = async_engine) -> dict:
+    pool = engine.pool
+    stats = pool.stats
+    return {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "avg_wait_time": (
+            stats.total_wait_time / stats.checkouts if stats.checkouts else 0.0
+        ),
+        "max_wait_time": stats.max_wait_time,
+    }
+
+
+def get_token_user_id(request: Request):
+    token_data = getattr(request.state, "token_data", None)
+    return token_data["user"]["user_id"] if token_data else None
+
+
+async def get_session(request: Request) -> AsyncSession:  # type: ignore
+    async with async_session_maker() as session:
         yield session
+
+        user_id = get_token_user_id(request)
+        if Config.DATABASE_REPLICA_URLS and user_id and session.info.get("has_writes"):
+            # keep this user's reads on the primary until replicas catch up
+            try:
+                await pin_user_to_primary(user_id)
+            except RedisError as e:
+                logger.warning("Could not pin user %s to primary: %s", user_id, e)
@@ -1,7 +1,7 @@
 from datetime import datetime, date
 from typing import List, Optional
 import uuid
-from sqlalchemy import Column
+from sqlalchemy import Column, Computed, Index, func
 from sqlmodel import Field, Relationship, SQLModel
 import sqlalchemy.dialects.postgresql as pg
 
@@ -13,7 +13,7 @@ class User(SQLModel, table=True):
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
     username: str
-    email: str
+    email: str = Field(index=True)
     first_name: str
     last_name: str
     role: str = Field(
@@ -28,10 +28,10 @@ class User(SQLModel, table=True):
         sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now)
     )
     books: List["Book"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
     reviews: List["Review"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
 
 
@@ -41,11 +41,37 @@ def __repr__(self):
 
 class BookTag(SQLModel, table=True):
     book_id: uuid.UUID = Field(default=None, foreign_key="books.id", primary_key=True)
-    tag_id: uuid.UUID = Field(default=None, foreign_key="tags.id", primary_key=True)
+    # the primary key only serves lookups by book_id
+    tag_id: uuid.UUID = Field(
+        default=None, foreign_key="tags.id", primary_key=True, index=True
+    )
+
+
+BOOK_SEARCH_CONFIG = "english"
+
+BOOK_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', title), 'A') || "
+    f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', author), 'B') || "
+    f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', publisher), 'C')"
+)
 
 
 class Book(SQLModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        # match the (created_at DESC, id DESC) keyset used to page the catalog
+        Index("ix_books_created_at_id", "created_at", "id"),
+        Index("ix_books_user_id_created_at_id", "user_id", "created_at", "id"),
+        # maintained by Postgres on every write; left unmapped so loading a
+        # book doesn't drag the vector along
+        Column(
+            "search_vector",
+            pg.TSVECTOR,
+            Computed(BOOK_SEARCH_VECTOR, persisted=True),
+        ),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     id: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -56,21 +82,36 @@ class Book(SQLModel, table=True):
     published_date: date
     page_count: int
     language: str
+    # kept up to date by ReviewService in the same transaction as the review
+    review_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_sum: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    avg_rating: Optional[float] = Field(
+        default=None, sa_column=Column(pg.DOUBLE_PRECISION, nullable=True)
+    )
     user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
     created_at: datetime = Field(
         sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now)
     )
+    # also bumped by review and tag changes, since the book's detail shows them
     updated_at: datetime = Field(
-        sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now)
+        sa_column=Column(
+            pg.TIMESTAMP, nullable=False, default=datetime.now, onupdate=datetime.now
+        )
+    )
+    user: Optional["User"] = Relationship(
+        back_populates="books", sa_relationship_kwargs={"lazy": "raise"}
     )
-    user: Optional["User"] = Relationship(back_populates="books")
     reviews: List["Review"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book", sa_relationship_kwargs={"lazy": "raise"}
     )
     tags: List["Tag"] = Relationship(
         back_populates="books",
         link_model=BookTag,
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
 
@@ -80,22 +121,41 @@ def __repr__(self):
 
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # one per sort of a book's reviews, each ending in the keyset columns
+        Index("ix_reviews_book_id_created_at_id", "book_id", "created_at", "id"),
+        Index(
+            "ix_reviews_book_id_rating_created_at_id",
+            "book_id",
+            "rating",
+            "created_at",
+            "id",
+        ),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
     rating: int = Field(lt=5)
     review_text: str
-    user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
+    user_id: Optional[uuid.UUID] = Field(
+        default=None, foreign_key="users.id", index=True
+    )
     book_id: Optional[uuid.UUID] = Field(default=None, foreign_key="books.id")
     created_at: datetime = Field(
         sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now)
     )
     updated_at: datetime = Field(
-        sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now)
+        sa_column=Column(
+            pg.TIMESTAMP, nullable=False, default=datetime.now, onupdate=datetime.now
+        )
+    )
+    user: Optional["User"] = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
+    book: Optional["Book"] = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
     )
-    user: Optional["User"] = Relationship(back_populates="reviews")
-    book: Optional["Book"] = Relationship(back_populates="reviews")
 
 
 def __repr__(self):
@@ -112,7 +172,12 @@ class Tag(SQLModel, table=True):
     books: List["Book"] = Relationship(
         link_model=BookTag,
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
+    )
+
+    __table_args__ = (
+        # tag names are unique regardless of case; also serves name lookups
+        Index("ux_tags_name_lower", func.lower(name.sa_column), unique=True),
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,23 @@
+import base64
+import binascii
+import json
+from typing import Any, List
+from src.errors import InvalidCursor
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Pack the sort key of the last row on a page into an opaque token"""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        raise InvalidCursor()
+
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor()
+    return values
@@ -1,13 +1,278 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set
 import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from src.cache import BloomFilter
 from src.config import Config
 
-token_blocklist = aioredis.from_url(Config.REDIS_URL)
+logger = logging.getLogger(__name__)
+
+redis_client = aioredis.from_url(Config.REDIS_URL)
+
+# pub/sub channel -> local callbacks, fed by listen_for_messages
+_message_handlers: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+# called whenever the subscription is (re)established, since anything
+# published while we were disconnected has been lost
+_resync_handlers: List[Callable] = []
+# called as soon as the subscription drops
+_disconnect_handlers: List[Callable[[], None]] = []
+
+JTI_REVOCATION_CHANNEL = "jti_revocations"
+# blocklist keys are bare uuid4 JTIs
+JTI_KEY_PATTERN = "????????-????-????-????-????????????"
+
+
+class RevokedTokenFilter:
+    """Local mirror of the JTI blocklist.
+
+    A JTI that is not in the filter has not been revoked, so the Redis
+    lookup can be skipped. The filter is only trusted while this worker's
+    pub/sub subscription is live; it is seeded from Redis each time the
+    subscription is (re)established and dropped the moment it is lost, so
+    a revocation is missed for at most the pub/sub delivery delay.
+    """
+
+    def __init__(self):
+        self.filter: Optional[BloomFilter] = None
+        self.synced_at = float("-inf")
+        self._epoch = 0
+        self._pending: Optional[List[str]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._resync_lock = asyncio.Lock()
+
+    def add(self, jti: str) -> None:
+        if self.filter is not None:
+            self.filter.add(jti)
+        if self._pending is not None:
+            self._pending.append(jti)
+
+    def might_contain(self, jti: str) -> bool:
+        if self.filter is None:
+            return True
+
+        # revoked JTIs expire from Redis but never leave a bloom filter, so
+        # rebuild now and then to keep the false positive rate down
+        age = time.monotonic() - self.synced_at
+        if age > Config.BLOCKLIST_REBUILD_INTERVAL and self._rebuild_task is None:
+            self._rebuild_task = asyncio.create_task(self._rebuild())
+
+        return jti in self.filter
+
+    async def resync(self) -> None:
+        async with self._resync_lock:
+            epoch = self._epoch
+            # revocations that arrive while the scan runs may not be in it
+            self._pending = []
+            try:
+                jtis = [key.decode() async for key in scan_blocklist()]
+                jtis.extend(self._pending)
+            finally:
+                self._pending = None
+
+            if epoch != self._epoch:
+                # the subscription dropped mid-scan, so the result can't be trusted
+                return
+
+            bloom = BloomFilter(
+                capacity=max(Config.BLOCKLIST_FILTER_CAPACITY, 2 * len(jtis)),
+                error_rate=Config.BLOCKLIST_FILTER_ERROR_RATE,
+            )
+            for jti in jtis:
+                bloom.add(jti)
+
+            self.filter = bloom
+            self.synced_at = time.monotonic()
+
+    async def _rebuild(self) -> None:
+        try:
+            await self.resync()
+        except RedisError as e:
+            logger.warning("Could not rebuild the revoked token filter: %s", e)
+        finally:
+            self._rebuild_task = None
+
+    def invalidate(self) -> None:
+        self._epoch += 1
+        self.filter = None
+
+
+revoked_tokens = RevokedTokenFilter()
+
+
+def scan_blocklist():
+    return redis_client.scan_iter(match=JTI_KEY_PATTERN, count=1000)
 
 
 async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(name=jti, value="", ex=Config.JTI_EXPIRY)
+    await redis_client.set(name=jti, value="", ex=Config.JTI_EXPIRY)
+    revoked_tokens.add(jti)
+    await publish(JTI_REVOCATION_CHANNEL, jti)
 
 
 async def token_in_blocklist(jti: str) -> bool:
-    jti = await token_blocklist.get(jti)
+    if not revoked_tokens.might_contain(jti):
+        return False
+
+    jti = await redis_client.get(jti)
     return jti is not None
+
+
+async def pin_user_to_primary(user_id: str) -> None:
+    await redis_client.set(
+        name=f"primary_pin:{user_id}", value="", ex=Config.READ_YOUR_WRITES_SECONDS
+    )
+
+
+async def user_pinned_to_primary(user_id: str) -> bool:
+    return await redis_client.exists(f"primary_pin:{user_id}") > 0
+
+
+def subscribe(
+    channel: str,
+    handler: Callable[[str], None],
+    on_resync: Optional[Callable] = None,
+    on_disconnect: Optional[Callable[[], None]] = None,
+) -> None:
+    _message_handlers[channel].append(handler)
+    if on_resync is not None:
+        _resync_handlers.append(on_resync)
+    if on_disconnect is not None:
+        _disconnect_handlers.append(on_disconnect)
+
+
+async def publish(channel: str, message: str) -> None:
+    try:
+        await redis_client.publish(channel, message)
+    except RedisError as e:
+        logger.warning("Could not publish to %s: %s", channel, e)
+
+
+def dispatch_message(channel: str, message: str) -> None:
+    for handler in _message_handlers.get(channel, ()):
+        try:
+            handler(message)
+        except Exception:
+            logger.exception("Handler for %s failed", channel)
+
+
+async def listen_for_messages() -> None:
+    """Feed pub/sub messages to the local handlers for the life of the worker"""
+    if not _message_handlers:
+        return
+
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(*_message_handlers)
+                for on_resync in _resync_handlers:
+                    result = on_resync()
+                    if inspect.isawaitable(result):
+                        await result
+
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        dispatch_message(
+                            message["channel"].decode(), message["data"].decode()
+                        )
+        except RedisError as e:
+            logger.warning("Pub/sub connection lost, retrying: %s", e)
+        finally:
+            for on_disconnect in _disconnect_handlers:
+                on_disconnect()
+        await asyncio.sleep(1)
+
+
+class MirroredIndex:
+    """Base for in-memory structures loaded from Postgres and kept current
+    on every worker through a pub/sub channel.
+
+    Subclasses implement load() to build a fresh structure, install() to
+    swap it in and apply_change() to apply one published change. If the
+    subscription drops, changes published in the meantime are lost, so the
+    structure is reloaded once it comes back, and changes that arrive
+    while loading are replayed on top of the result. That reload runs in
+    the background: the listener has to keep delivering revocations and
+    invalidations while a large index is built.
+    """
+
+    name = "index"
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._stale = True
+        self._pending: Optional[List[str]] = None
+        self._lock = asyncio.Lock()
+        self._refreshes: Set[asyncio.Task] = set()
+        subscribe(
+            channel,
+            self.apply,
+            on_resync=self.refresh_soon,
+            on_disconnect=self.invalidate,
+        )
+
+    async def load(self):
+        raise NotImplementedError
+
+    def install(self, structure) -> None:
+        raise NotImplementedError
+
+    def apply_change(self, change: dict) -> None:
+        raise NotImplementedError
+
+    def apply(self, message: str) -> None:
+        self.apply_change(json.loads(message))
+        if self._pending is not None:
+            self._pending.append(message)
+
+    async def rebuild(self) -> None:
+        self._pending = []
+        try:
+            structure = await self.load()
+        finally:
+            pending, self._pending = self._pending, None
+
+        self.install(structure)
+        for message in pending:
+            self.apply(message)
+
+    async def ensure_fresh(self) -> None:
+        """Reload unless the structure is known to be current"""
+        async with self._lock:
+            if not self._stale:
+                return
+            self._stale = False
+            try:
+                await self.rebuild()
+            except Exception:
+                # keep serving the old structure and retry on the next resync
+                logger.exception("Could not rebuild the %s", self.name)
+                self._stale = True
+
+    def refresh_soon(self) -> None:
+        """Start ensure_fresh without waiting for it"""
+        # the loop only keeps weak references to tasks
+        task = asyncio.create_task(self.ensure_fresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    async def publish_change(self, change: dict) -> None:
+        """Apply a change here and send it to the other workers"""
+        message = json.dumps(change, default=str)
+        self.apply(message)
+        await publish(self.channel, message)
+
+
+subscribe(
+    JTI_REVOCATION_CHANNEL,
+    revoked_tokens.add,
+    on_resync=revoked_tokens.resync,
+    on_disconnect=revoked_tokens.invalidate,
+)
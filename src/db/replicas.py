@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+from fastapi import Request
+from redis.exceptions import RedisError
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.config import Config
+from src.db.main import (
+    async_session_maker,
+    create_engine_from_url,
+    create_session_maker,
+    get_token_user_id,
+    warm_up_pool,
+)
+from src.db.redis import user_pinned_to_primary
+
+logger = logging.getLogger(__name__)
+
+# on a replica with nothing left to replay the last replay timestamp keeps
+# aging even though it is fully caught up, so only count lag while WAL is
+# still waiting to be applied
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = create_engine_from_url(url)
+        self.session_maker = create_session_maker(self.engine)
+        self.available = True
+        self.lag = 0.0
+        self.checked_at = float("-inf")
+
+    async def measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(REPLICA_LAG_QUERY)
+            return float(result.scalar_one())
+
+    async def is_available(self) -> bool:
+        now = time.monotonic()
+        if now - self.checked_at >= Config.REPLICA_HEALTH_CHECK_INTERVAL:
+            # stamp first so concurrent requests reuse the last known state
+            self.checked_at = now
+            try:
+                self.lag = await asyncio.wait_for(
+                    self.measure_lag(), Config.REPLICA_HEALTH_CHECK_TIMEOUT
+                )
+                self.available = self.lag <= Config.REPLICA_MAX_LAG_SECONDS
+            except Exception as e:
+                logger.warning("Replica %s health check failed: %s", self.engine.url, e)
+                self.available = False
+        return self.available
+
+    def mark_failed(self) -> None:
+        self.available = False
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cursor = 0
+
+    async def choose(self) -> Optional[Replica]:
+        """Round-robin over the replicas, skipping any that are down or lagging"""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._cursor % len(self.replicas)]
+            self._cursor += 1
+            if await replica.is_available():
+                return replica
+        return None
+
+    async def warm_up(self) -> None:
+        for replica in self.replicas:
+            try:
+                await warm_up_pool(replica.engine)
+            except Exception as e:
+                logger.warning("Replica %s warm-up failed: %s", replica.engine.url, e)
+                replica.mark_failed()
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_router = ReplicaRouter(
+    [url.strip() for url in Config.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+)
+
+
+async def reads_pinned_to_primary(request: Request) -> bool:
+    user_id = get_token_user_id(request)
+    if user_id is None:
+        return False
+    try:
+        return await user_pinned_to_primary(user_id)
+    except RedisError as e:
+        logger.warning("Could not check primary pin for user %s: %s", user_id, e)
+        return True
+
+
+async def open_read_session(request: Request) -> AsyncSession:
+    if replica_router.replicas and not await reads_pinned_to_primary(request):
+        replica = await replica_router.choose()
+        if replica is not None:
+            session = replica.session_maker()
+            try:
+                # check out the connection now so a dead replica falls back
+                # to the primary instead of failing the request
+                await session.connection()
+                return session
+            except Exception as e:
+                logger.warning("Replica %s unavailable: %s", replica.engine.url, e)
+                replica.mark_failed()
+                await session.close()
+
+    return async_session_maker()
+
+
+async def get_read_session(request: Request) -> AsyncSession:  # type: ignore
+    """Session for read-only handlers, served by a replica when one is healthy"""
+    async with await open_read_session(request) as session:
+        yield session
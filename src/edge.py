@@ -0,0 +1,138 @@
+"""Caching policies for the CDN in front of the API, and purges of it.
+
+Routes declare a CachePolicy among their dependencies; a router-wide
+default keeps everything else out of shared caches. The policy's headers
+are added to 200 and 304 responses to GET requests, including a
+Surrogate-Key header naming what the response shows, such as book:{id}.
+Writes purge those keys once they are committed, through whichever Purger
+is configured.
+"""
+
+import asyncio
+import json
+import time
+from typing import Iterable, List, Optional, Sequence
+from fastapi import FastAPI, Request
+from src.auth.utils import RateLimitedLog
+from src.config import Config
+
+SURROGATE_KEY_HEADER = "Surrogate-Key"
+
+purge_failure_log = RateLimitedLog(interval=Config.FAILURE_LOG_INTERVAL)
+
+
+class CachePolicy:
+    """Dependency declaring how a route's responses may be cached.
+
+    surrogate_keys are formatted with the route's path parameters; a
+    handler can add keys known only once it has loaded the resource with
+    add_surrogate_keys.
+    """
+
+    def __init__(
+        self,
+        cache_control: str,
+        vary: Sequence[str] = ("Accept-Encoding",),
+        surrogate_keys: Sequence[str] = (),
+    ):
+        self.cache_control = cache_control
+        self.vary = vary
+        self.surrogate_keys = surrogate_keys
+
+    async def __call__(self, request: Request) -> None:
+        # a route's policy runs after its router's default and replaces it
+        request.state.cache_policy = self
+        request.state.surrogate_keys = [
+            key.format(**request.path_params) for key in self.surrogate_keys
+        ]
+
+    def headers(self, surrogate_keys: List[str]) -> dict:
+        headers = {"Cache-Control": self.cache_control}
+        if self.vary:
+            headers["Vary"] = ", ".join(self.vary)
+        if surrogate_keys:
+            headers[SURROGATE_KEY_HEADER] = " ".join(dict.fromkeys(surrogate_keys))
+        return headers
+
+
+def public_policy(max_age: int, *surrogate_keys: str) -> CachePolicy:
+    """Shared caches keep the response for max_age seconds or until one of
+    its keys is purged; browsers revalidate with the ETag every time.
+
+    Only for routes that don't authenticate: public and s-maxage both let a
+    shared cache store responses to requests with an Authorization header
+    and serve them to anyone.
+    """
+    return CachePolicy(
+        f"public, max-age=0, s-maxage={max_age}", surrogate_keys=surrogate_keys
+    )
+
+
+# responses that depend on who is asking
+private_policy = CachePolicy("private, no-store", vary=())
+
+# the same for every user but behind authentication: only the client keeps
+# a copy, and revalidates it with the ETag
+revalidate_policy = CachePolicy("private, no-cache")
+
+
+def add_surrogate_keys(request: Request, keys: Iterable[str]) -> None:
+    request.state.surrogate_keys.extend(keys)
+
+
+def register_cache_policies(app: FastAPI) -> None:
+    @app.middleware("http")
+    async def cache_policy(request: Request, call_next):
+        response = await call_next(request)
+        policy: Optional[CachePolicy] = getattr(request.state, "cache_policy", None)
+        if (
+            policy is None
+            or request.method not in ("GET", "HEAD")
+            or response.status_code not in (200, 304)
+            or "cache-control" in response.headers
+        ):
+            return response
+        response.headers.update(policy.headers(request.state.surrogate_keys))
+        return response
+
+
+class Purger:
+    """Sends surrogate key purges to the CDN; this one drops them"""
+
+    async def purge(self, keys: List[str]) -> None:
+        pass
+
+
+class LogFilePurger(Purger):
+    """Appends each purge to a file as a JSON line, standing in for a CDN
+    in development and tests"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, line: str) -> None:
+        with open(self.path, "a") as f:
+            f.write(line + "\n")
+
+    async def purge(self, keys: List[str]) -> None:
+        line = json.dumps({"keys": keys, "at": time.time()})
+        await asyncio.to_thread(self._append, line)
+
+
+purger: Purger = (
+    LogFilePurger(Config.CDN_PURGE_LOG) if Config.CDN_PURGE_LOG else Purger()
+)
+
+
+def set_purger(new_purger: Purger) -> None:
+    global purger
+    purger = new_purger
+
+
+async def purge(*keys: str) -> None:
+    """Purge surrogate keys after a committed write. Failures are logged;
+    the entries then expire with their s-maxage."""
+    try:
+        await purger.purge(list(dict.fromkeys(keys)))
+    except Exception as e:
+        purge_failure_log.warning("CDN purge of %s failed: %s", keys, e)
@@ -106,6 +106,26 @@ class PasswordNotMatch(BooklyException):
     pass
 
 
+class InvalidCursor(BooklyException):
+    """Pagination cursor is malformed"""
+
+    pass
+
+
+class TooManyLoginAttempts(BooklyException):
+    """Too many login attempts, try again later"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class ServerBusy(BooklyException):
+    """Server is too busy to handle this request"""
+
+    pass
+
+
 class InternalServerError(BooklyException):
     """Internal server error occurred"""
 
@@ -118,7 +138,11 @@ def create_exception_handler(
 
     async def exception_handler(request: Request, exc: BooklyException):
 
-        return JSONResponse(content=initial_detail, status_code=status_code)
+        return JSONResponse(
+            content=initial_detail,
+            status_code=status_code,
+            headers=getattr(exc, "headers", None),
+        )
 
     return exception_handler
 
@@ -283,6 +307,39 @@ def register_error_handlers(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        TooManyLoginAttempts,
+        create_exception_handler(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            initial_detail={
+                "message": "Too many login attempts, please try again later",
+                "error_code": "too_many_login_attempts",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        ServerBusy,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Server is busy, please try again shortly",
+                "error_code": "server_busy",
+            },
+        ),
+    )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
 
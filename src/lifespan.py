@@ -0,0 +1,115 @@
+"""Startup warm-up and shutdown of the application.
+
+Warm-up runs in the background once the app starts, so a slow or failing
+step doesn't hold up the process; GET /monitoring/ready answers 503 until
+every step has been attempted, and load balancers hold traffic until then.
+A failed step is logged and left to the first requests that need it.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import FastAPI
+from src.auth.utils import password_hasher
+from src.books.autocomplete import book_autocomplete
+from src.books.facets import book_tag_index
+from src.books.leaderboard import top_books
+from src.books.service import BookService
+from src.config import Config
+from src.db.main import async_engine, async_session_maker, warm_up_pool
+from src.db.redis import listen_for_messages, redis_client
+from src.db.replicas import replica_router
+from src.tags.service import TagService
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up_redis_pool() -> None:
+    """Open Redis connections up front, like warm_up_pool does for Postgres"""
+    await asyncio.gather(
+        *(redis_client.ping() for _ in range(Config.REDIS_POOL_WARMUP_CONNECTIONS))
+    )
+
+
+async def preload_tag_catalog() -> None:
+    await TagService(BookService()).get_tag_catalog()
+
+
+async def preload_hot_books() -> None:
+    """Cache the details of the books most reviewed this week; there is no
+    view count, and reviews are the closest measure of interest"""
+    if Config.WARMUP_HOT_BOOKS <= 0:
+        return
+    hot = await top_books("reviews", "7d", Config.WARMUP_HOT_BOOKS)
+    if not hot:
+        return
+    async with async_session_maker() as session:
+        await BookService().preload_book_details([id for id, _ in hot], session)
+
+
+class WarmUp:
+    """Steps run in order by run(); ready once all of them have finished,
+    whether they succeeded or not"""
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Awaitable[None]]]]):
+        self.steps = steps
+        self.done: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.ready = False
+        self.duration: Optional[float] = None
+
+    async def run(self) -> None:
+        started = time.perf_counter()
+        for name, step in self.steps:
+            try:
+                await step()
+            except Exception as e:
+                logger.warning("Warm-up step %s failed: %s", name, e)
+                self.failed[name] = str(e)
+            else:
+                self.done.append(name)
+        self.duration = time.perf_counter() - started
+        self.ready = True
+        logger.info("Warm-up finished in %.2fs", self.duration)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "done": self.done,
+            "failed": self.failed,
+            "pending": [
+                name
+                for name, _ in self.steps
+                if name not in self.done and name not in self.failed
+            ],
+            "duration": self.duration,
+        }
+
+
+warm_up = WarmUp(
+    [
+        ("db_pool", warm_up_pool),
+        ("replica_pools", replica_router.warm_up),
+        ("redis_pool", warm_up_redis_pool),
+        ("autocomplete", book_autocomplete.ensure_fresh),
+        ("tag_index", book_tag_index.ensure_fresh),
+        ("tag_catalog", preload_tag_catalog),
+        ("hot_books", preload_hot_books),
+    ]
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = asyncio.create_task(listen_for_messages())
+    warming = asyncio.create_task(warm_up.run())
+    yield
+    warming.cancel()
+    listener.cancel()
+    await asyncio.gather(warming, listener, return_exceptions=True)
+    await replica_router.dispose()
+    await async_engine.dispose()
+    await redis_client.aclose()
+    password_hasher.shutdown()
@@ -3,6 +3,8 @@ import time
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from src.conditional import register_conditional_get
+from src.edge import register_cache_policies
 
 
 logger = logging.getLogger("uvicorn.access")
@@ -10,6 +12,10 @@ logger.disabled = True
 
 
 def register_middleware(app: FastAPI):
+    register_conditional_get(app)
+    # outside the ETag middleware, so its 304s get the policy headers too
+    register_cache_policies(app)
+
     @app.middleware("http")
     async def custom_logging(request: Request, call_next):
         start_time = time.time()
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+
+from src.auth.dependencies import RoleChecker
+from src.auth.utils import password_hasher
+from src.books.cache import book_detail_cache
+from src.db.main import get_pool_stats
+from src.lifespan import warm_up
+
+monitoring_router = APIRouter()
+admin_role_checker = Depends(RoleChecker(["admin"]))
+
+
+@monitoring_router.get(
+    "/db-pool",
+    status_code=status.HTTP_200_OK,
+    dependencies=[admin_role_checker],
+)
+async def db_pool_stats():
+    return get_pool_stats()
+
+
+@monitoring_router.get(
+    "/password-hashing",
+    status_code=status.HTTP_200_OK,
+    dependencies=[admin_role_checker],
+)
+async def password_hashing_stats():
+    return password_hasher.stats()
+
+
+@monitoring_router.get(
+    "/book-cache",
+    status_code=status.HTTP_200_OK,
+    dependencies=[admin_role_checker],
+)
+async def book_cache_stats():
+    return book_detail_cache.stats()
+
+
+@monitoring_router.get("/ready", status_code=status.HTTP_200_OK)
+async def readiness():
+    """Unauthenticated, for load balancer probes"""
+    if not warm_up.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=warm_up.status(),
+        )
+    return warm_up.status()
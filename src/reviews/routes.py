@@ -1,31 +1,36 @@
 import logging
-from typing import List
-from fastapi import APIRouter, Depends, Query, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from fastapi.exceptions import HTTPException
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.auth.dependencies import get_current_user
+from src.auth.dependencies import get_current_principal
+from src.auth.schemas import UserPrincipal
+from src.conditional import is_fresh, not_modified, validators, weak_etag
+from src.config import Config
 from src.db.main import get_session
-from src.db.models import Review, User
+from src.db.replicas import get_read_session
+from src.db.models import Review
+from src.edge import private_policy, public_policy
 from src.errors import InternalServerError, ReviewNotFound
-from src.reviews.schemas import ReviewCreateModel, ReviewModel
+from src.reviews.schemas import ReviewCreateModel, ReviewModel, ReviewPage
 from src.reviews.service import ReviewService, get_review_service
 
 logger = logging.getLogger(__name__)
 
-review_router = APIRouter()
+review_router = APIRouter(dependencies=[Depends(private_policy)])
 
 
 @review_router.post("/book/{book_id}", status_code=status.HTTP_201_CREATED)
 async def add_review_to_book(
     book_id: str,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    principal: UserPrincipal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
     review_service: ReviewService = Depends(get_review_service),
 ) -> Review:
     try:
         new_review = await review_service.add_review_to_book(
-            user_email=current_user.email,
+            user_id=principal.id,
             book_id=book_id,
             review_data=review_data,
             session=session,
@@ -41,10 +46,51 @@ async def add_review_to_book(
         raise InternalServerError()
 
 
+@review_router.get(
+    "/book/{book_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=ReviewPage,
+    dependencies=[Depends(public_policy(Config.EDGE_DETAIL_TTL, "book:{book_id}"))],
+    summary="Fetch a book's reviews",
+    description="Page through a book's reviews, newest or highest rated first.",
+    responses={
+        200: {"description": "Reviews fetched successfully"},
+        400: {"description": "Malformed pagination cursor"},
+        404: {"description": "Book not found"},
+    },
+)
+async def get_book_reviews(
+    book_id: str,
+    request: Request,
+    response: Response,
+    sort: Literal["newest", "rating"] = "newest",
+    limit: int = Query(
+        Config.REVIEWS_PAGE_SIZE, ge=1, le=Config.REVIEWS_PAGE_SIZE_MAX
+    ),
+    cursor: Optional[str] = None,
+    # the primary: right after a purge, a lagging replica would hand the
+    # edge the page it just dropped, to keep for s-maxage
+    session: AsyncSession = Depends(get_session),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    # checked before the page is queried; the book row is all it takes
+    updated_at = await review_service.get_book_reviews_version(book_id, session)
+    etag = weak_etag(book_id, updated_at, sort, limit, cursor)
+    headers = validators(etag, updated_at)
+    if is_fresh(request, etag, updated_at):
+        return not_modified(headers)
+
+    response.headers.update(headers)
+    return await review_service.get_book_reviews(
+        book_id=book_id, session=session, sort=sort, limit=limit, cursor=cursor
+    )
+
+
 @review_router.get(
     "/{id}",
     status_code=status.HTTP_200_OK,
     response_model=ReviewModel,
+    dependencies=[Depends(public_policy(Config.EDGE_DETAIL_TTL, "review:{id}"))],
     summary="Fetch a review by ID",
     description="Fetch a review by its unique ID.",
     responses={
@@ -55,6 +101,9 @@ async def add_review_to_book(
 )
 async def get_review_by_id(
     id: str,
+    request: Request,
+    response: Response,
+    # the primary, like get_book_reviews
     session: AsyncSession = Depends(get_session),
     review_service: ReviewService = Depends(get_review_service),
 ):
@@ -63,6 +112,11 @@ async def get_review_by_id(
             id=id,
             session=session,
         )
+        etag = weak_etag(review.id, review.updated_at)
+        headers = validators(etag, review.updated_at)
+        if is_fresh(request, etag, review.updated_at):
+            return not_modified(headers)
+        response.headers.update(headers)
         return review
     except HTTPException as e:
         raise e
@@ -86,7 +140,7 @@ async def get_reviews_by_user(
     user_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, le=100),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     review_service: ReviewService = Depends(get_review_service),
 ):
     try:
@@ -120,14 +174,14 @@ async def get_reviews_by_user(
 async def update_review(
     id: str,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    principal: UserPrincipal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
     review_service: ReviewService = Depends(get_review_service),
 ) -> Review:
     try:
         updated_review = await review_service.update_review(
             id=id,
-            user_id=current_user.id,
+            user_id=principal.id,
             review_data=review_data,
             session=session,
         )
@@ -153,12 +207,12 @@ async def update_review(
 )
 async def delete_review(
     id: str,
-    current_user: User = Depends(get_current_user),
+    principal: UserPrincipal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
     review_service: ReviewService = Depends(get_review_service),
 ):
     is_deleted = await review_service.delete_review(
-        id=id, user_id=current_user.id, session=session
+        id=id, user_id=principal.id, session=session
     )
     if is_deleted:
         return None
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import uuid
 from pydantic import BaseModel, field_validator
 
@@ -14,6 +14,11 @@ class ReviewModel(BaseModel):
     updated_at: datetime
 
 
+class ReviewPage(BaseModel):
+    items: List[ReviewModel]
+    next_cursor: Optional[str] = None
+
+
 class ReviewCreateModel(BaseModel):
     rating: Optional[int] = None
     review_text: Optional[str] = None
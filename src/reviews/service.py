@@ -1,53 +1,100 @@
 import logging
-from typing import List
+import uuid
+from datetime import datetime
+from typing import List, Optional
 from fastapi import Depends
 from fastapi.exceptions import HTTPException
+from sqlalchemy import Float, cast, func, tuple_, update
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.db.models import Review
+from src.db.models import Book, Review
 from src.auth.service import UserService
+from src.books.cache import book_detail_cache
+from src.books.leaderboard import record_review
 from src.books.service import BookService
+from src.db.loaders import row_loader
+from src.edge import purge
+from src.db.pagination import decode_cursor, encode_cursor
 from src.errors import (
     BookNotFound,
     InternalServerError,
+    InvalidCursor,
     ReviewAlreadyExists,
     ReviewNotFound,
     UnauthorizedAccess,
-    UserNotFound,
 )
 from src.reviews.schemas import ReviewCreateModel
 
 logger = logging.getLogger(__name__)
 
+# keyset columns of each sort of a book's reviews, all descending
+REVIEW_SORTS = {
+    "newest": (Review.created_at, Review.id),
+    "rating": (Review.rating, Review.created_at, Review.id),
+}
+
+
+def review_sort_key(review: Review, sort: str) -> list:
+    key = [review.created_at.isoformat(), str(review.id)]
+    return [review.rating, *key] if sort == "rating" else key
+
+
+def decode_review_cursor(cursor: str, sort: str) -> tuple:
+    *rating, created_at, id = decode_cursor(cursor, len(REVIEW_SORTS[sort]))
+    if rating and not isinstance(rating[0], int):
+        raise InvalidCursor()
+    try:
+        return (*rating, datetime.fromisoformat(created_at), uuid.UUID(id))
+    except (TypeError, ValueError):
+        raise InvalidCursor()
+
 
 class ReviewService:
     def __init__(self, book_service: BookService, user_service: UserService):
         self.book_service = book_service
         self.user_service = user_service
 
+    async def _adjust_book_rating(
+        self, book_id, count_delta: int, sum_delta: int, session: AsyncSession
+    ) -> None:
+        """Apply a review change to the book's rating aggregates.
+
+        The update is relative to the stored values, so concurrent reviews
+        of the same book can't overwrite each other's changes.
+        """
+        review_count = Book.review_count + count_delta
+        rating_sum = Book.rating_sum + sum_delta
+        statement = (
+            update(Book)
+            .where(Book.id == book_id)
+            .values(
+                review_count=review_count,
+                rating_sum=rating_sum,
+                avg_rating=cast(rating_sum, Float) / func.nullif(review_count, 0),
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+        await session.exec(statement)
+
     async def add_review_to_book(
         self,
-        user_email: str,
+        user_id: str,
         book_id: str,
         review_data: ReviewCreateModel,
         session: AsyncSession,
     ) -> Review:
         try:
 
-            book = await self.book_service.get_book(id=book_id, session=session)
+            book = await self.book_service.get_book(
+                id=book_id, session=session, options=(), with_recent_reviews=False
+            )
             if not book:
                 raise BookNotFound()
 
-            user = await self.user_service.get_user_by_email(
-                email=user_email, session=session
-            )
-            if not user:
-                raise UserNotFound()
-
             existing_review = (
                 await session.exec(
                     select(Review).where(
-                        Review.user_id == user.id, Review.book_id == book.id
+                        Review.user_id == user_id, Review.book_id == book.id
                     )
                 )
             ).first()
@@ -56,11 +103,15 @@ class ReviewService:
                 raise ReviewAlreadyExists()
 
             review_data_dict = review_data.model_dump()
-            new_review = Review(**review_data_dict, user=user, book=book)
+            new_review = Review(**review_data_dict, user_id=user_id, book=book)
 
             session.add(new_review)
+            await self._adjust_book_rating(book.id, 1, new_review.rating, session)
             await session.commit()
             await session.refresh(new_review)
+            await book_detail_cache.invalidate([book.id])
+            await purge(f"book:{book.id}")
+            await record_review(book.id, 1, new_review.rating, new_review.created_at)
 
             return new_review
 
@@ -92,13 +143,56 @@ class ReviewService:
             logger.exception("Failed to fetch reviews by user: %s", e)
             raise InternalServerError()
 
+    async def get_book_reviews_version(self, book_id: str, session: AsyncSession):
+        """When a book's reviews last changed, without loading any of them"""
+        book = await self.book_service.get_book(
+            book_id, session, options=(), with_recent_reviews=False
+        )
+        if not book:
+            raise BookNotFound()
+        return book.updated_at
+
+    async def get_book_reviews(
+        self,
+        book_id: str,
+        session: AsyncSession,
+        sort: str = "newest",
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ):
+        """A page of a book's reviews, resuming after the sort key packed in
+        the cursor"""
+        book = await self.book_service.get_book(
+            book_id, session, options=(), with_recent_reviews=False
+        )
+        if not book:
+            raise BookNotFound()
+
+        columns = REVIEW_SORTS[sort]
+        statement = select(Review).where(Review.book_id == book.id)
+        if cursor is not None:
+            key = decode_review_cursor(cursor, sort)
+            statement = statement.where(tuple_(*columns) < key)
+
+        # one extra row tells us whether there is another page
+        statement = statement.order_by(*(column.desc() for column in columns))
+        result = await session.exec(statement.limit(limit + 1))
+        reviews = result.all()
+
+        next_cursor = None
+        if len(reviews) > limit:
+            reviews = reviews[:limit]
+            next_cursor = encode_cursor(review_sort_key(reviews[-1], sort))
+
+        return {"items": reviews, "next_cursor": next_cursor}
+
     async def get_review_by_id(
         self,
         id: str,
         session: AsyncSession,
     ) -> Review:
         try:
-            review = await session.get(Review, id)
+            review = await row_loader(session, Review, Review.id).load(id)
             if not review:
                 raise ReviewNotFound()
             return review
@@ -113,20 +207,30 @@ class ReviewService:
         review_data: ReviewCreateModel,
         session: AsyncSession,
     ) -> Review:
-        review = await session.get(Review, id)
+        # locked so a concurrent edit can't apply its rating delta twice
+        review = await session.get(Review, id, with_for_update=True)
         if not review:
             raise ReviewNotFound()
         if review.user_id != user_id:
             raise UnauthorizedAccess()
 
+        rating_delta = 0
         if review_data.rating is not None:
+            rating_delta = review_data.rating - review.rating
             review.rating = review_data.rating
+        # even with no rating change this bumps the book's updated_at, which
+        # versions the reviews shown with it
+        await self._adjust_book_rating(review.book_id, 0, rating_delta, session)
         if review_data.review_text is not None:
             review.review_text = review_data.review_text
 
         session.add(review)
         await session.commit()
         await session.refresh(review)
+        await book_detail_cache.invalidate([review.book_id])
+        await purge(f"book:{review.book_id}", f"review:{review.id}")
+        if rating_delta:
+            await record_review(review.book_id, 0, rating_delta, review.created_at)
 
         return review
 
@@ -136,14 +240,18 @@ class ReviewService:
         user_id: str,
         session: AsyncSession,
     ):
-        review = await session.get(Review, id)
+        review = await session.get(Review, id, with_for_update=True)
         if not review:
             raise ReviewNotFound()
         if review.user_id != user_id:
             raise UnauthorizedAccess()
 
+        await self._adjust_book_rating(review.book_id, -1, -review.rating, session)
         await session.delete(review)
         await session.commit()
+        await book_detail_cache.invalidate([review.book_id])
+        await purge(f"book:{review.book_id}", f"review:{review.id}")
+        await record_review(review.book_id, -1, -review.rating, review.created_at)
 
 
 def get_review_service(
@@ -0,0 +1,76 @@
+"""Per-worker copy of the tag catalog, versioned through Redis.
+
+Every change to tags or to which books carry them increments a counter
+in Redis after committing. A worker serves its copy for as long as the
+counter matches the value it was loaded under, so a read costs one Redis
+GET and no Postgres query.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+from redis.exceptions import RedisError
+from src.auth.utils import RateLimitedLog
+from src.config import Config
+from src.db.redis import redis_client
+from src.tags.schemas import TagCountModel
+
+TAG_VERSION_KEY = "tags:version"
+
+# stamp of a copy loaded while the version couldn't be read
+UNKNOWN_VERSION = object()
+
+cache_failure_log = RateLimitedLog(interval=Config.FAILURE_LOG_INTERVAL)
+
+
+class TagCatalogCache:
+    def __init__(self):
+        self.version = UNKNOWN_VERSION
+        self.tags: Optional[List[TagCountModel]] = None
+        self.loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _current_version(self):
+        try:
+            # a counter that was never bumped, or lost with Redis, reads as 0
+            return await redis_client.get(TAG_VERSION_KEY) or b"0"
+        except RedisError as e:
+            cache_failure_log.warning("Tag version read failed: %s", e)
+            return UNKNOWN_VERSION
+
+    def _is_current(self, version) -> bool:
+        if self.tags is None:
+            return False
+        if version is UNKNOWN_VERSION:
+            # without Redis, fall back to reloading every TAG_CACHE_TTL
+            return time.monotonic() - self.loaded_at < Config.TAG_CACHE_TTL
+        return version == self.version
+
+    async def get(
+        self, load: Callable[[], Awaitable[List[TagCountModel]]]
+    ) -> Tuple[Optional[bytes], List[TagCountModel]]:
+        """The tag list and the version it is current for, or None for the
+        version if Redis couldn't be reached"""
+        version = await self._current_version()
+        if not self._is_current(version):
+            async with self._lock:
+                # another request may have reloaded while this one waited
+                if not self._is_current(version):
+                    tags = await load()
+                    self.tags, self.version = tags, version
+                    self.loaded_at = time.monotonic()
+
+        tags = self.tags
+        return (None if version is UNKNOWN_VERSION else version), tags
+
+    async def bump(self) -> None:
+        """Make every worker reload on its next read"""
+        self.version = UNKNOWN_VERSION
+        self.loaded_at = float("-inf")
+        try:
+            await redis_client.incr(TAG_VERSION_KEY)
+        except RedisError as e:
+            cache_failure_log.warning("Tag version bump failed: %s", e)
+
+
+tag_catalog_cache = TagCatalogCache()
@@ -1,31 +1,46 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 from src.auth.dependencies import RoleChecker
-from src.books.schemas import Book
+from src.conditional import is_fresh, not_modified, validators, weak_etag
 from src.db.main import get_session
-
-from .schemas import TagAddModel, TagCreateModel, TagModel
+from src.edge import private_policy, revalidate_policy
+
+from .schemas import (
+    BookTagsModel,
+    TagAddModel,
+    TagCountModel,
+    TagCreateModel,
+    TagModel,
+)
 from .service import TagService, get_tag_service
 
-tags_router = APIRouter()
+tags_router = APIRouter(dependencies=[Depends(private_policy)])
 user_role_checker = Depends(RoleChecker(["user", "admin"]))
 admin_role_checker = Depends(RoleChecker(["admin"]))
+revalidate = Depends(revalidate_policy)
 
 
 @tags_router.get(
     "/",
-    response_model=List[TagModel],
-    dependencies=[user_role_checker],
+    response_model=List[TagCountModel],
+    dependencies=[user_role_checker, revalidate],
 )
 async def get_all_tags(
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
     tag_service: TagService = Depends(get_tag_service),
 ):
-    tags = await tag_service.get_tags(session)
+    version, tags = await tag_service.get_tag_catalog()
+    if version is not None:
+        etag = weak_etag("tags", version)
+        headers = validators(etag)
+        if is_fresh(request, etag):
+            return not_modified(headers)
+        response.headers.update(headers)
     return tags
 
 
@@ -46,20 +61,22 @@ async def add_tag(
 
 
 @tags_router.post(
-    "/book/{book_id}/tags", response_model=Book, dependencies=[user_role_checker]
+    "/book/{book_id}/tags",
+    response_model=BookTagsModel,
+    dependencies=[user_role_checker],
 )
 async def add_tags_to_book(
     book_id: str,
     tag_data: TagAddModel,
     session: AsyncSession = Depends(get_session),
     tag_service: TagService = Depends(get_tag_service),
-) -> Book:
+) -> BookTagsModel:
 
-    book_with_tag = await tag_service.add_tags_to_book(
+    book_tags = await tag_service.add_tags_to_book(
         book_id=book_id, tag_data=tag_data, session=session
     )
 
-    return book_with_tag
+    return book_tags
 
 
 @tags_router.put(
@@ -11,9 +11,18 @@ class TagModel(BaseModel):
     created_at: datetime
 
 
+class TagCountModel(TagModel):
+    book_count: int
+
+
 class TagCreateModel(BaseModel):
     name: str
 
 
 class TagAddModel(BaseModel):
     tags: List[TagCreateModel]
+
+
+class BookTagsModel(BaseModel):
+    book_id: uuid.UUID
+    tags: List[TagModel]
@@ -1,13 +1,21 @@
+from typing import List
+
 from fastapi import Depends
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.books.cache import book_detail_cache
+from src.books.facets import book_tag_index
 from src.books.service import BookService, get_book_service
-from src.db.models import Book, Tag
+from src.tags.cache import tag_catalog_cache
+from src.db.loaders import row_loader
+from src.db.main import async_session_maker
+from src.db.models import Book, BookTag, Tag
 from src.errors import BookNotFound, TagAlreadyExists, TagNotFound
 
-from .schemas import TagAddModel, TagCreateModel
-
+from .schemas import BookTagsModel, TagAddModel, TagCountModel, TagCreateModel
 
 
 class TagService:
@@ -15,51 +23,122 @@ class TagService:
     def __init__(self, book_service: BookService):
         self.book_service = book_service
 
-    async def get_tags(self, session: AsyncSession):
-        """Get all tags"""
-        statement = select(Tag).order_by(Tag.created_at.desc())
+    async def get_tags(self, session: AsyncSession) -> List[TagCountModel]:
+        """Get all tags with the number of books carrying each"""
+        statement = (
+            select(
+                Tag.id,
+                Tag.name,
+                Tag.created_at,
+                func.count(BookTag.book_id).label("book_count"),
+            )
+            .outerjoin(BookTag, BookTag.tag_id == Tag.id)
+            .group_by(Tag.id)
+            .order_by(Tag.created_at.desc())
+        )
         result = await session.exec(statement)
-        return result.all()
+        return [TagCountModel(**row._mapping) for row in result.all()]
+
+    async def get_tag_catalog(self):
+        """The version stamp and tags, from this worker's copy unless a tag
+        change was made since it was loaded"""
+
+        async def load():
+            # from the primary: a replica may not have the change behind the
+            # version yet, and the copy would be stamped current regardless
+            async with async_session_maker() as session:
+                return await self.get_tags(session)
+
+        return await tag_catalog_cache.get(load)
+
+    async def _get_tag_by_name(self, name: str, session: AsyncSession):
+        statement = select(Tag).where(func.lower(Tag.name) == name.lower())
+        result = await session.exec(statement)
+        return result.first()
 
     async def add_tags_to_book(
         self, book_id: str, tag_data: TagAddModel, session: AsyncSession
-    ) -> Book:
-        """Add tags to a book"""
-        book = await self.book_service.get_book(id=book_id, session=session)
-        print("book", book)
+    ) -> BookTagsModel:
+        """Add tags to a book, creating the ones that don't exist yet.
+
+        Takes the same few statements however many tags are given: one to
+        create the missing tags, one to link them all and one to read back
+        the book's tags.
+        """
+        book = await self.book_service.get_book(
+            id=book_id, session=session, options=(), with_recent_reviews=False
+        )
         if not book:
             raise BookNotFound()
 
+        # first spelling wins when the same tag is given in different cases
+        names = {}
         for tag_item in tag_data.tags:
-            result = await session.exec(select(Tag).where(Tag.name == tag_item.name))
-            tag = result.one_or_none()
-            if not tag:
-                tag = Tag(name=tag_item.name)
-            book.tags.append(tag)
-        session.add(book)
+            name = tag_item.name.strip()
+            if name:
+                names.setdefault(name.lower(), name)
+
+        if names:
+            await session.exec(
+                insert(Tag)
+                .values([{"name": name} for name in names.values()])
+                .on_conflict_do_nothing(index_elements=[func.lower(Tag.name)])
+            )
+            # a separate statement so it also sees tags another request
+            # created while ours was waiting on the conflict
+            await session.exec(
+                insert(BookTag)
+                .from_select(
+                    ["book_id", "tag_id"],
+                    select(literal(book.id, Tag.id.type), Tag.id).where(
+                        func.lower(Tag.name).in_(list(names))
+                    ),
+                )
+                .on_conflict_do_nothing()
+            )
+            await self.book_service.touch_books(session, Book.id == book.id)
+
+        result = await session.exec(
+            select(Tag)
+            .join(BookTag, BookTag.tag_id == Tag.id)
+            .where(BookTag.book_id == book.id)
+            .order_by(Tag.name)
+        )
+        tags = result.all()
         await session.commit()
-        await session.refresh(book)
-        return book
+        await book_detail_cache.invalidate([book.id])
+        await tag_catalog_cache.bump()
+
+        if names:
+            await book_tag_index.book_tagged(book, list(names.values()))
+        return BookTagsModel(book_id=book.id, tags=tags)
 
     async def get_tag_by_id(self, tag_id: str, session: AsyncSession):
         """Get tag by id"""
-        statement = select(Tag).where(Tag.id == tag_id)
-        result = await session.exec(statement)
-        return result.first()
+        return await row_loader(session, Tag, Tag.id).load(tag_id)
 
     async def add_tag(self, tag_data: TagCreateModel, session: AsyncSession):
         """Create a tag"""
-        statement = select(Tag).where(Tag.name == tag_data.name)
-        result = await session.exec(statement)
-        if result.first():
+        if await self._get_tag_by_name(tag_data.name, session):
             raise TagAlreadyExists()
 
         new_tag = Tag(name=tag_data.name)
         session.add(new_tag)
         await session.commit()
+        await tag_catalog_cache.bump()
 
         return new_tag
 
+    async def _tagged_book_ids(self, tag_id, session: AsyncSession):
+        result = await session.exec(
+            select(BookTag.book_id).where(BookTag.tag_id == tag_id)
+        )
+        return result.all()
+
+    async def _touch_tagged_books(self, tag_id, session: AsyncSession):
+        tagged = select(BookTag.book_id).where(BookTag.tag_id == tag_id)
+        await self.book_service.touch_books(session, Book.id.in_(tagged))
+
     async def update_tag(
         self, tag_id, tag_update_data: TagCreateModel, session: AsyncSession
     ):
@@ -67,12 +146,27 @@ class TagService:
         tag = await self.get_tag_by_id(tag_id, session)
         if not tag:
             raise TagNotFound()
+        old_name = tag.name
+
+        existing = await self._get_tag_by_name(tag_update_data.name, session)
+        if existing and existing.id != tag.id:
+            raise TagAlreadyExists()
 
         for key, value in tag_update_data.model_dump().items():
             setattr(tag, key, value)
 
+        renamed = tag.name != old_name
+        book_ids = []
+        if renamed:
+            book_ids = await self._tagged_book_ids(tag.id, session)
+            await self._touch_tagged_books(tag.id, session)
+
         await session.commit()
+        await tag_catalog_cache.bump()
         await session.refresh(tag)
+        if renamed:
+            await book_detail_cache.invalidate(book_ids)
+            await book_tag_index.tag_renamed(old_name, tag.name)
         return tag
 
     async def delete_tag(self, tag_id: str, session: AsyncSession):
@@ -80,8 +174,14 @@ class TagService:
         tag = await self.get_tag_by_id(tag_id, session)
         if not tag:
             raise TagNotFound()
+        name = tag.name
+        book_ids = await self._tagged_book_ids(tag.id, session)
+        await self._touch_tagged_books(tag.id, session)
         await session.delete(tag)
         await session.commit()
+        await tag_catalog_cache.bump()
+        await book_detail_cache.invalidate(book_ids)
+        await book_tag_index.tag_deleted(name)
 
 
 def get_tag_service(book_service: BookService = Depends(get_book_service)):
@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from src.db.main import get_session
+from src.db.replicas import get_read_session
 from src.auth.dependencies import (
     AccessTokenBearer,
     get_role_checker,
@@ -23,6 +24,7 @@ refresh_token_bearer = RefreshTokenBearer()
 role_checker = get_role_checker()
 
 app.dependency_overrides[get_session] = get_mock_session
+app.dependency_overrides[get_read_session] = get_mock_session
 app.dependency_overrides[access_token_bearer] = Mock()
 app.dependency_overrides[refresh_token_bearer] = Mock()
 app.dependency_overrides[get_role_checker] = Mock()
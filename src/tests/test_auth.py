@@ -1,4 +1,24 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from redis.exceptions import RedisError
+from src import app
 from src.auth.schemas import UserCreateModel
+from src.auth.service import get_user_service
+from src.auth.throttling import SlidingWindowThrottle
+from src.auth.utils import (
+    PasswordHasher,
+    RateLimitedLog,
+    create_access_token,
+    decode_token_cached,
+)
+from src.config import Config
+from src.errors import ServerBusy
 
 auth_prefix = f"/api/v1/auth"
 
@@ -20,3 +40,90 @@ def test_user_creation(fake_session, fake_user_service, test_client):
     )
     assert fake_user_service.create_user_called_once()
     assert fake_user_service.create_user_called_once_with(user_data, fake_session)
+
+
+def test_verified_token_is_decoded_once():
+    token = create_access_token(data={"email": "a@b.com", "user_id": "1"})
+
+    with patch("src.auth.utils.jwt.decode", wraps=jwt.decode) as decode:
+        first = decode_token_cached(token)
+        second = decode_token_cached(token)
+
+    assert first == second
+    assert decode.call_count == 1
+
+
+def test_invalid_token_failures_are_rate_limited():
+    log = RateLimitedLog(interval=60)
+    with patch("src.auth.utils.logging.warning") as warning:
+        for _ in range(5):
+            log.warning("Rejected token: %s", "bad signature")
+
+    assert warning.call_count == 1
+    assert log.suppressed == 4
+
+
+def test_password_hasher_rejects_callers_after_queue_timeout():
+    hasher = PasswordHasher(workers=1, queue_timeout=0.05)
+
+    async def exercise():
+        slow = asyncio.create_task(hasher._run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ServerBusy):
+            await hasher._run(time.sleep, 0)
+        await slow
+
+    asyncio.run(exercise())
+    hasher.shutdown()
+
+    assert hasher.rejected == 1
+    assert hasher.stats()["calls"] == 1
+
+
+def test_password_hasher_upgrades_outdated_hashes():
+    hasher = PasswordHasher(workers=1, queue_timeout=1)
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+
+    valid, new_hash = asyncio.run(hasher.verify_and_update("secret", outdated))
+    hasher.shutdown()
+
+    assert valid
+    assert new_hash is not None and new_hash != outdated
+
+
+def test_login_is_throttled_per_account():
+    user_service = Mock()
+    user_service.get_user_by_email = AsyncMock(return_value=None)
+    app.dependency_overrides[get_user_service] = lambda: user_service
+    client = TestClient(app, base_url="http://localhost")
+    login_data = {"email": "throttled@example.com", "password": "wrong-password"}
+
+    def memory_throttle(name, limit, window):
+        # fresh in-memory buckets, so attempts left in Redis by an earlier
+        # run can't leak into this one
+        throttle = SlidingWindowThrottle(name, limit, window)
+        throttle._put_redis = AsyncMock(side_effect=RedisError("disabled"))
+        return throttle
+
+    try:
+        with patch(
+            "src.auth.throttling.ip_throttle",
+            memory_throttle("login_ip", Config.LOGIN_IP_LIMIT, Config.LOGIN_IP_WINDOW),
+        ), patch(
+            "src.auth.throttling.account_throttle",
+            memory_throttle(
+                "login_account",
+                Config.LOGIN_ACCOUNT_LIMIT,
+                Config.LOGIN_ACCOUNT_WINDOW,
+            ),
+        ):
+            responses = [
+                client.post(url=f"{auth_prefix}/login", json=login_data)
+                for _ in range(6)
+            ]
+    finally:
+        del app.dependency_overrides[get_user_service]
+
+    assert [r.status_code for r in responses] == [400] * 5 + [429]
+    assert int(responses[-1].headers["Retry-After"]) > 0
+    assert user_service.get_user_by_email.await_count == 5
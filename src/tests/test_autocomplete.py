@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from src.books.autocomplete import BookAutocomplete, PrefixIndex, normalize
+
+
+def make_index():
+    index = PrefixIndex()
+    index.add("1", "The Hobbit", "J. R. R. Tolkien")
+    index.add("2", "The Fellowship of the Ring", "J. R. R. Tolkien")
+    index.add("3", "Cien años de soledad", "Gabriel García Márquez")
+    index.add("4", "Harry Potter and the Philosopher's Stone", "J. K. Rowling")
+    return index
+
+
+def titles(results):
+    return [result["title"] for result in results]
+
+
+def test_normalize_strips_case_accents_and_punctuation():
+    assert normalize("  García-Márquez's  AÑOS ") == "garcia marquez s anos"
+
+
+def test_autocomplete_matches_last_word_as_prefix():
+    index = make_index()
+
+    assert titles(index.search("hob", 10)) == ["The Hobbit"]
+    assert titles(index.search("tolkien fell", 10)) == ["The Fellowship of the Ring"]
+    assert titles(index.search("marquez", 10)) == ["Cien años de soledad"]
+
+
+def test_autocomplete_ranks_title_prefix_matches_first():
+    index = make_index()
+
+    assert titles(index.search("the", 10))[0] == "The Hobbit"
+
+
+def test_autocomplete_tolerates_typos():
+    index = make_index()
+
+    assert titles(index.search("tolkein", 10)) == [
+        "The Hobbit",
+        "The Fellowship of the Ring",
+    ]
+    assert titles(index.search("harry poter", 10)) == [
+        "Harry Potter and the Philosopher's Stone"
+    ]
+
+
+def test_autocomplete_updates_and_removals():
+    index = make_index()
+
+    index.add("1", "The Silmarillion", "J. R. R. Tolkien")
+    assert index.search("hobbit", 10) == []
+    assert titles(index.search("silm", 10)) == ["The Silmarillion"]
+
+    index.remove("1")
+    index.remove("1")
+    assert index.search("silm", 10) == []
+    assert len(index) == 3
+
+
+def test_autocomplete_applies_published_changes():
+    autocomplete = BookAutocomplete()
+
+    autocomplete.apply(json.dumps({"id": "9", "title": "Dune", "author": "Herbert"}))
+    assert titles(autocomplete.search("du", 10)) == ["Dune"]
+
+    autocomplete.apply(json.dumps({"id": "9", "deleted": True}))
+    assert autocomplete.search("du", 10) == []
+
+
+def test_autocomplete_resync_rebuilds_without_blocking_messages():
+    autocomplete = BookAutocomplete()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return PrefixIndex()
+
+    autocomplete.load = load
+
+    async def run():
+        # called by the pub/sub listener, which must not wait for the build
+        autocomplete.refresh_soon()
+        await asyncio.sleep(0)
+        autocomplete.apply(json.dumps({"id": "9", "title": "Dune", "author": "F"}))
+        assert titles(autocomplete.search("du", 10)) == ["Dune"]
+
+        release.set()
+        await asyncio.gather(*autocomplete._refreshes)
+
+    asyncio.run(run())
+    # the change delivered during the build is replayed on the new index
+    assert titles(autocomplete.search("du", 10)) == ["Dune"]
@@ -1,3 +1,17 @@
+import asyncio
+import uuid
+from unittest.mock import ANY, AsyncMock, Mock, patch
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.orm import selectinload
+from src.books.schemas import BookBatchRequest
+from src.books.service import BookService
+from src.db.models import Book
+from src.config import Config
+from src.db.pagination import decode_cursor, encode_cursor
+from src.errors import InvalidCursor
+
 books_prefix = f"/api/v1/books"
 
 
@@ -6,3 +20,44 @@ def test_get_all_books(test_client, fake_book_service, fake_session):
 
     assert fake_book_service.get_all_books_called_once()
     assert fake_book_service.get_all_books_called_once_with(fake_session)
+
+
+def test_book_cursor_round_trip():
+    cursor = encode_cursor(["2025-01-25T23:57:49.688114", "6fa68411-625a-4c1b"])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [
+        "2025-01-25T23:57:49.688114",
+        "6fa68411-625a-4c1b",
+    ]
+
+
+def test_book_cursor_rejects_garbage():
+    for cursor in ["not a cursor!", encode_cursor(["only-one"]), encode_cursor({})]:
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, 2)
+
+
+def test_book_batch_request_is_capped():
+    BookBatchRequest(ids=[uuid.uuid4()] * Config.BOOKS_BATCH_MAX)
+    for ids in ([], [uuid.uuid4()] * (Config.BOOKS_BATCH_MAX + 1)):
+        with pytest.raises(ValidationError):
+            BookBatchRequest(ids=ids)
+
+
+def test_recent_reviews_follow_the_flag_not_the_options_object():
+    book_service = BookService()
+    book_service.attach_recent_reviews = AsyncMock()
+    book = Mock()
+    loader = Mock(load=AsyncMock(return_value=book))
+    # equal to BOOK_DETAIL_OPTIONS, but a different tuple
+    options = (selectinload(Book.tags),)
+
+    with patch("src.books.service.row_loader", return_value=loader):
+        asyncio.run(book_service.get_book("1", Mock(), options))
+        book_service.attach_recent_reviews.assert_awaited_once_with([book], ANY)
+
+        book_service.attach_recent_reviews.reset_mock()
+        asyncio.run(
+            book_service.get_book("1", Mock(), options, with_recent_reviews=False)
+        )
+        book_service.attach_recent_reviews.assert_not_awaited()
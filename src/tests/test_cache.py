@@ -0,0 +1,258 @@
+import asyncio
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from redis.exceptions import ConnectionError
+
+from starlette.requests import Request
+
+from src.auth.cache import (
+    PRINCIPAL_INVALIDATION_CHANNEL,
+    cache_principal,
+    get_cached_principal,
+    principal_cache,
+)
+from src.auth.schemas import UserPrincipal
+from src.books.cache import (
+    BOOK_INVALIDATION_CHANNEL,
+    BookDetailCache,
+    CachedBody,
+    book_detail_cache,
+)
+from src.books.service import BookService
+from src.cache import BloomFilter, LRUCache
+from src.conditional import http_date, is_fresh, weak_etag
+from src.db.redis import JTI_REVOCATION_CHANNEL, RevokedTokenFilter, dispatch_message
+from src.tags.cache import TagCatalogCache
+from src.tags.service import TagService
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=10, ttl=5)
+    with patch("src.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("src.cache.time.monotonic", return_value=104.0):
+        assert cache.get("a") == 1
+    with patch("src.cache.time.monotonic", return_value=106.0):
+        assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_principal_dropped_by_invalidation_message():
+    principal = UserPrincipal(id=uuid.uuid4(), role="user", is_verified=True)
+    cache_principal(principal, principal_cache.generation)
+    assert get_cached_principal(str(principal.id)) == principal
+
+    dispatch_message(PRINCIPAL_INVALIDATION_CHANNEL, str(principal.id))
+
+    assert get_cached_principal(str(principal.id)) is None
+
+
+def test_principal_loaded_before_invalidation_is_not_cached():
+    principal = UserPrincipal(id=uuid.uuid4(), role="user", is_verified=False)
+    generation = principal_cache.generation
+
+    dispatch_message(PRINCIPAL_INVALIDATION_CHANNEL, str(principal.id))
+    cache_principal(principal, generation)
+
+    assert get_cached_principal(str(principal.id)) is None
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    jtis = [str(uuid.uuid4()) for _ in range(1000)]
+    for jti in jtis:
+        bloom.add(jti)
+
+    assert all(jti in bloom for jti in jtis)
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(1000))
+    assert false_positives < 50
+
+
+def test_revoked_token_filter_skips_redis_only_when_trusted():
+    revoked = RevokedTokenFilter()
+    jti = str(uuid.uuid4())
+    assert revoked.might_contain(jti)
+
+    async def seed():
+        async def keys():
+            yield b"00000000-0000-0000-0000-000000000000"
+
+        with patch("src.db.redis.scan_blocklist", keys):
+            await revoked.resync()
+
+    asyncio.run(seed())
+    assert not revoked.might_contain(jti)
+    assert revoked.might_contain("00000000-0000-0000-0000-000000000000")
+
+    revoked.add(jti)
+    assert revoked.might_contain(jti)
+
+    revoked.invalidate()
+    assert revoked.might_contain(str(uuid.uuid4()))
+
+
+def test_book_cache_coalesces_concurrent_misses():
+    cache = BookDetailCache()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0)
+        return CachedBody(b'{"id": "1"}', 'W/"1"', datetime(2025, 1, 25))
+
+    async def run():
+        redis = MagicMock(hgetall=AsyncMock(return_value={}))
+        pipe = redis.pipeline.return_value.__aenter__.return_value = MagicMock()
+        pipe.execute = AsyncMock()
+        with patch("src.books.cache.redis_client", redis):
+            bodies = await asyncio.gather(*(cache.get("1", load) for _ in range(5)))
+            assert [entry.body for entry in bodies] == [b'{"id": "1"}'] * 5
+            assert (await cache.get("1", load)).body == b'{"id": "1"}'
+
+    asyncio.run(run())
+    assert len(loads) == 1
+    stats = cache.stats()
+    assert stats["coalesced_misses"] == 4
+    assert stats["local"]["bytes"] == len(b'{"id": "1"}')
+
+
+def test_book_cache_dropped_by_invalidation_message():
+    book_detail_cache.local.set("1", b"one")
+    book_detail_cache.local.set("2", b"two")
+
+    dispatch_message(BOOK_INVALIDATION_CHANNEL, "1,3")
+
+    assert book_detail_cache.local.get("1") is None
+    assert book_detail_cache.local.get("2") == b"two"
+
+
+def test_book_cache_preload_loads_only_what_redis_lacks():
+    cache = BookDetailCache()
+    cached = CachedBody(b'{"id": "1"}', 'W/"1"', datetime(2025, 1, 25))
+    loaded = CachedBody(b'{"id": "2"}', 'W/"2"', datetime(2025, 1, 25))
+    load_many = AsyncMock(return_value={"2": loaded})
+
+    async def run():
+        redis = MagicMock()
+        pipe = redis.pipeline.return_value.__aenter__.return_value = MagicMock()
+        # what HGETALL returns for the hash to_redis() wrote
+        fields = {
+            name.encode(): value if isinstance(value, bytes) else value.encode()
+            for name, value in cached.to_redis().items()
+        }
+        pipe.execute = AsyncMock(side_effect=[[fields, {}], []])
+        with patch("src.books.cache.redis_client", redis):
+            await cache.preload(["1", "2"], load_many)
+
+    asyncio.run(run())
+    load_many.assert_awaited_once_with(["2"])
+    assert cache.local.get("1") == cached
+    assert cache.local.get("2") == loaded
+
+
+def test_book_detail_misses_load_from_the_primary():
+    book_service = BookService()
+    book_service.get_book = AsyncMock(return_value=None)
+    primary = Mock()
+    session_maker = MagicMock()
+    session_maker.return_value.__aenter__.return_value = primary
+
+    async def get(book_id, load):
+        return await load()
+
+    with patch("src.books.service.async_session_maker", session_maker), patch(
+        "src.books.service.book_detail_cache", Mock(get=get)
+    ):
+        book_id = uuid.uuid4()
+        assert asyncio.run(book_service.get_book_detail(str(book_id))) is None
+
+    book_service.get_book.assert_awaited_once_with(book_id, primary)
+
+
+def make_request(**headers):
+    return Request(
+        {
+            "type": "http",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def test_conditional_get_matches_validators():
+    etag = weak_etag(b"body")
+    modified = datetime(2025, 1, 25, 12, 0, 0, 500000)
+
+    assert is_fresh(make_request(if_none_match=etag), etag, modified)
+    assert is_fresh(make_request(if_none_match=f'"x", {etag[2:]}'), etag)
+    assert not is_fresh(make_request(if_none_match='W/"other"'), etag, modified)
+    assert is_fresh(make_request(if_modified_since=http_date(modified)), etag, modified)
+    assert not is_fresh(
+        make_request(if_modified_since=http_date(datetime(2025, 1, 24))),
+        etag,
+        modified,
+    )
+    # If-None-Match wins over If-Modified-Since
+    assert not is_fresh(
+        make_request(if_none_match='W/"x"', if_modified_since=http_date(modified)),
+        etag,
+        modified,
+    )
+
+
+def test_tag_catalog_reloads_only_when_version_moves():
+    cache = TagCatalogCache()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return [f"tag{len(loads)}"]
+
+    async def run():
+        versions = {"tags:version": None}
+        redis = MagicMock(get=AsyncMock(side_effect=versions.get))
+        with patch("src.tags.cache.redis_client", redis):
+            assert await cache.get(load) == (b"0", ["tag1"])
+            assert await cache.get(load) == (b"0", ["tag1"])
+            versions["tags:version"] = b"1"
+            assert await cache.get(load) == (b"1", ["tag2"])
+
+            redis.get.side_effect = ConnectionError("down")
+            assert await cache.get(load) == (None, ["tag2"])
+
+    asyncio.run(run())
+    assert len(loads) == 2
+
+
+def test_tag_catalog_reloads_from_the_primary():
+    tag_service = TagService(Mock())
+    tag_service.get_tags = AsyncMock(return_value=[])
+    primary = Mock()
+    session_maker = MagicMock()
+    session_maker.return_value.__aenter__.return_value = primary
+
+    async def get(load):
+        return b"1", await load()
+
+    with patch("src.tags.service.async_session_maker", session_maker), patch(
+        "src.tags.service.tag_catalog_cache", Mock(get=get)
+    ):
+        assert asyncio.run(tag_service.get_tag_catalog()) == (b"1", [])
+
+    tag_service.get_tags.assert_awaited_once_with(primary)
@@ -0,0 +1,24 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from src.db.main import InstrumentedAsyncPool
+
+
+def test_pool_records_checkouts_and_timeouts():
+    pool = InstrumentedAsyncPool(creator=Mock, pool_size=1, max_overflow=0, timeout=0.01)
+
+    async def exercise():
+        connection = await greenlet_spawn(pool.connect)
+        with pytest.raises(PoolTimeoutError):
+            await greenlet_spawn(pool.connect)
+        await greenlet_spawn(connection.close)
+
+    asyncio.run(exercise())
+
+    assert pool.stats.checkouts == 1
+    assert pool.stats.timeouts == 1
+    assert pool.recreate().stats is pool.stats
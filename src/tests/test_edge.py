@@ -0,0 +1,150 @@
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.routing import APIRoute
+from fastapi.security import HTTPBearer
+from fastapi.testclient import TestClient
+
+from src import app, edge
+from src.auth.dependencies import RoleChecker, get_current_principal
+from src.conditional import register_conditional_get
+from src.db.main import get_session
+from src.db.replicas import get_read_session
+from src.edge import (
+    CachePolicy,
+    LogFilePurger,
+    add_surrogate_keys,
+    private_policy,
+    public_policy,
+    purge,
+    register_cache_policies,
+    set_purger,
+)
+from src.reviews.service import get_review_service
+from src.tests.conftest import get_mock_session
+
+
+def make_client():
+    router = APIRouter(dependencies=[Depends(private_policy)])
+
+    @router.get(
+        "/books/{id}", dependencies=[Depends(public_policy(60, "book:{id}"))]
+    )
+    async def get_book(id: str, request: Request):
+        add_surrogate_keys(request, ["tag:1"])
+        return {"id": id}
+
+    @router.get("/me")
+    async def me():
+        return {"user": "1"}
+
+    app = FastAPI()
+    register_conditional_get(app)
+    register_cache_policies(app)
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_route_policy_overrides_router_default():
+    client = make_client()
+
+    response = client.get("/books/42")
+    assert response.headers["cache-control"] == "public, max-age=0, s-maxage=60"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["surrogate-key"] == "book:42 tag:1"
+
+    response = client.get("/me")
+    assert response.headers["cache-control"] == "private, no-store"
+    assert "surrogate-key" not in response.headers
+
+
+def test_not_modified_keeps_policy_headers():
+    client = make_client()
+    etag = client.get("/books/42").headers["etag"]
+
+    response = client.get("/books/42", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["surrogate-key"] == "book:42 tag:1"
+
+
+def test_log_file_purger_records_purged_keys(tmp_path):
+    path = tmp_path / "purges.log"
+    previous = edge.purger
+    set_purger(LogFilePurger(str(path)))
+    try:
+        asyncio.run(purge("books", "book:42", "books"))
+    finally:
+        set_purger(previous)
+
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)["keys"] == ["books", "book:42"]
+
+
+def dependency_calls(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from dependency_calls(dependency)
+
+
+def is_authentication(call):
+    return (
+        isinstance(call, (HTTPBearer, RoleChecker)) or call is get_current_principal
+    )
+
+
+def test_shared_caches_only_store_unauthenticated_routes():
+    shared = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        calls = list(dependency_calls(route.dependant))
+        policies = [call for call in calls if isinstance(call, CachePolicy)]
+        # the route's own policy comes last and is the one applied
+        if policies and "public" in policies[-1].cache_control:
+            shared.append(route.path)
+            assert not any(map(is_authentication, calls)), route.path
+            # a purge is only as good as the read that refills the edge
+            assert get_read_session not in calls, route.path
+
+    assert "/api/v1/reviews/book/{book_id}" in shared
+
+
+def test_refetch_after_a_review_purge_reads_the_primary():
+    review_service = Mock()
+    review_service.get_book_reviews_version = AsyncMock(
+        return_value=datetime(2025, 1, 25)
+    )
+    review_service.get_book_reviews = AsyncMock(
+        return_value={"items": [], "next_cursor": None}
+    )
+    primary = Mock()
+    sessions = []
+
+    def replica_session():
+        raise AssertionError("edge-cached read went to a replica")
+
+    def primary_session():
+        sessions.append(primary)
+        yield primary
+
+    app.dependency_overrides[get_review_service] = lambda: review_service
+    app.dependency_overrides[get_read_session] = replica_session
+    app.dependency_overrides[get_session] = primary_session
+    client = TestClient(app, base_url="http://localhost")
+    try:
+        asyncio.run(purge("book:42"))
+        response = client.get("/api/v1/reviews/book/42")
+    finally:
+        del app.dependency_overrides[get_review_service]
+        # back to the conftest overrides
+        app.dependency_overrides[get_read_session] = get_mock_session
+        app.dependency_overrides[get_session] = get_mock_session
+
+    assert response.status_code == 200
+    assert response.headers["surrogate-key"] == "book:42"
+    assert sessions == [primary]
+    assert review_service.get_book_reviews.await_args.kwargs["session"] is primary
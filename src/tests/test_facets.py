@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from src.books.facets import TagBitmap, book_tag_index
+from src.books.service import BookService
+from src.db.pagination import decode_cursor
+
+START = datetime(2024, 1, 1)
+
+
+def make_index():
+    books = [(str(n), START + timedelta(minutes=n)) for n in range(1, 7)]
+    book_tags = [
+        ("1", "Fantasy"),
+        ("2", "Fantasy"),
+        ("2", "Classic"),
+        ("3", "Sci-Fi"),
+        ("4", "fantasy"),
+        ("4", "Classic"),
+        ("5", "Classic"),
+        ("6", "Fantasy"),
+    ]
+    return TagBitmap.build(books, book_tags)
+
+
+def test_tag_search_modes_return_newest_first():
+    index = make_index()
+
+    ids, next_key, _ = index.search(["fantasy", "classic"], "all", 10)
+    assert ids == ["4", "2"]
+    assert next_key is None
+
+    ids, _, _ = index.search(["Sci-Fi", "Classic"], "any", 10)
+    assert ids == ["5", "4", "3", "2"]
+
+    assert index.search(["fantasy", "missing"], "all", 10)[0] == []
+
+
+def test_tag_search_counts_other_tags_in_matches():
+    index = make_index()
+
+    _, _, facets = index.search(["fantasy"], "all", 10)
+
+    assert facets == [{"name": "Classic", "count": 2}]
+
+
+def test_tag_search_pages_with_cursor_keys():
+    index = make_index()
+
+    ids, next_key, _ = index.search(["fantasy"], "all", 2)
+    assert ids == ["6", "4"]
+    assert next_key == (START + timedelta(minutes=4), "4")
+
+    # the key stays usable after the book it came from is removed
+    index.remove_book("4")
+    ids, next_key, _ = index.search(["fantasy"], "all", 2, next_key)
+    assert ids == ["2", "1"]
+    assert next_key is None
+
+
+def test_tag_index_changes():
+    index = make_index()
+
+    index.tag_book("7", START + timedelta(minutes=7), ["Sci-Fi"])
+    assert index.search(["sci-fi"], "all", 10)[0] == ["7", "3"]
+
+    index.rename_tag("Sci-Fi", "Science Fiction")
+    assert index.search(["science fiction"], "all", 10)[0] == ["7", "3"]
+    assert index.search(["sci-fi"], "all", 10)[0] == []
+
+    index.remove_book("4")
+    index.remove_tag("Classic")
+    ids, _, facets = index.search(["fantasy"], "all", 10)
+    assert ids == ["6", "2", "1"]
+    assert facets == []
+
+
+def test_tag_search_pages_books_that_arrive_out_of_order():
+    index = make_index()
+    index.tag_book("8", START + timedelta(minutes=8), ["Fantasy"])
+    # created before books 6 and 8, but added after them
+    index.tag_book("5b", START + timedelta(minutes=5, seconds=30), ["Fantasy"])
+    index.tag_book("0", START, ["Fantasy"])
+
+    pages, before = [], None
+    while True:
+        ids, before, _ = index.search(["fantasy"], "all", 2, before)
+        pages.append(ids)
+        if before is None:
+            break
+
+    assert pages == [["8", "6"], ["5b", "4"], ["2", "1"], ["0"]]
+
+
+def test_tag_page_cursor_survives_index_changes_while_loading():
+    index = make_index()
+    book_service = BookService()
+
+    async def get_books_by_ids(ids, session):
+        # the listener applies a removal while the page is being read
+        index.remove_book(ids[-1])
+        return []
+
+    book_service.get_books_by_ids = get_books_by_ids
+    with patch.object(book_tag_index, "index", index):
+        page = asyncio.run(
+            book_service.get_books_by_tags(["fantasy"], "all", Mock(), 2)
+        )
+
+    assert decode_cursor(page["next_cursor"], 2)[1] == "4"
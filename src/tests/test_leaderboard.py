@@ -0,0 +1,91 @@
+import asyncio
+import os
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError
+
+import src.books.leaderboard as leaderboard
+from src.config import Config
+
+
+def test_window_buckets_cover_the_window_ending_today():
+    buckets = leaderboard.window_buckets("7d")
+
+    assert len(buckets) == 7
+    assert buckets[0] == datetime.now().strftime("%Y%m%d")
+    assert buckets == sorted(buckets, reverse=True)
+
+
+def test_review_is_counted_in_the_day_it_was_written(monkeypatch):
+    script = AsyncMock()
+    monkeypatch.setattr(leaderboard, "RECORD_SCRIPT", script)
+
+    asyncio.run(leaderboard.record_review("b1", -1, -4, datetime(2025, 1, 25, 23, 59)))
+
+    keys = script.await_args.kwargs["keys"]
+    assert keys[:2] == [
+        "leaderboard:reviews:20250125",
+        "leaderboard:rating_sum:20250125",
+    ]
+    assert script.await_args.kwargs["args"][:3] == ["b1", -1, -4]
+
+
+def test_leaderboard_failures_do_not_fail_the_review(monkeypatch):
+    monkeypatch.setattr(
+        leaderboard, "RECORD_SCRIPT", AsyncMock(side_effect=ConnectionError())
+    )
+
+    asyncio.run(leaderboard.record_review("b1", 1, 5, datetime.now()))
+
+
+def test_rating_merge_is_a_single_script_call(monkeypatch):
+    monkeypatch.setattr(
+        leaderboard, "redis_client", AsyncMock(exists=AsyncMock(return_value=0))
+    )
+    script = AsyncMock()
+    monkeypatch.setattr(leaderboard, "MERGE_RATINGS_SCRIPT", script)
+
+    dest = asyncio.run(leaderboard.merged_key("rating", "7d"))
+
+    buckets = leaderboard.window_buckets("7d")
+    assert script.await_args.kwargs["keys"] == [
+        dest,
+        f"{dest}:counts",
+        f"{dest}:sums",
+        *map(leaderboard.count_key, buckets),
+        *map(leaderboard.sum_key, buckets),
+    ]
+    assert script.await_args.kwargs["args"][0] == 7
+    leaderboard.redis_client.pipeline.assert_not_called()
+
+
+@pytest.mark.skipif(not os.getenv("TEST_REDIS_URL"), reason="needs a scratch Redis")
+def test_concurrent_cold_rating_merges_both_see_the_leaderboard(monkeypatch):
+    async def run():
+        client = Redis.from_url(os.environ["TEST_REDIS_URL"])
+        monkeypatch.setattr(leaderboard, "redis_client", client)
+        monkeypatch.setattr(
+            leaderboard,
+            "MERGE_RATINGS_SCRIPT",
+            client.register_script(leaderboard.MERGE_RATINGS_SCRIPT.script),
+        )
+        monkeypatch.setattr(Config, "LEADERBOARD_MIN_REVIEWS", 1)
+        today = leaderboard.window_buckets("7d")[0]
+        try:
+            await client.flushdb()
+            await client.zadd(leaderboard.count_key(today), {"b1": 2, "b2": 1})
+            await client.zadd(leaderboard.sum_key(today), {"b1": 9, "b2": 3})
+
+            keys = await asyncio.gather(
+                *(leaderboard.merged_key("rating", "7d") for _ in range(2))
+            )
+            return [await client.zrange(key, 0, -1, withscores=True) for key in keys]
+        finally:
+            await client.flushdb()
+            await client.aclose()
+
+    first, second = asyncio.run(run())
+    assert first == second == [(b"b2", 3.0), (b"b1", 4.5)]
@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src import app
+from src.books.autocomplete import book_autocomplete
+from src.books.facets import book_tag_index
+from src.lifespan import WarmUp, warm_up
+from src.tags.cache import TagCatalogCache
+
+readiness_url = "/api/v1/monitoring/ready"
+
+
+def test_warm_up_is_ready_after_every_step_even_if_one_fails():
+    first = AsyncMock(side_effect=ConnectionRefusedError("db down"))
+    second = AsyncMock()
+    warm_up = WarmUp([("db_pool", first), ("tag_catalog", second)])
+
+    assert warm_up.status()["pending"] == ["db_pool", "tag_catalog"]
+    asyncio.run(warm_up.run())
+
+    second.assert_awaited_once()
+    status = warm_up.status()
+    assert status["ready"]
+    assert status["done"] == ["tag_catalog"]
+    assert status["failed"] == {"db_pool": "db down"}
+    assert status["pending"] == []
+
+
+def test_readiness_reports_unavailable_until_warm_up_finishes():
+    test_client = TestClient(app, base_url="http://localhost")
+    warm_up = WarmUp([("db_pool", AsyncMock())])
+
+    with patch("src.monitoring.routes.warm_up", warm_up):
+        response = test_client.get(readiness_url)
+        assert response.status_code == 503
+        assert response.json()["pending"] == ["db_pool"]
+
+        asyncio.run(warm_up.run())
+        response = test_client.get(readiness_url)
+
+    assert response.status_code == 200
+    assert response.json()["ready"]
+
+
+def test_warm_up_steps_succeed_with_their_io_mocked():
+    connection = MagicMock()
+    connection.__aenter__.return_value.execute = AsyncMock()
+    session = MagicMock()
+    session.exec = AsyncMock(return_value=Mock(all=Mock(return_value=[])))
+    session_maker = MagicMock()
+    session_maker.return_value.__aenter__.return_value = session
+    book_cache = Mock(preload=AsyncMock())
+
+    with patch.object(AsyncEngine, "connect", return_value=connection), patch(
+        "src.lifespan.redis_client", Mock(ping=AsyncMock())
+    ), patch.object(book_autocomplete, "load", AsyncMock()), patch.object(
+        book_autocomplete, "install"
+    ), patch.object(book_tag_index, "load", AsyncMock()), patch.object(
+        book_tag_index, "install"
+    ), patch(
+        "src.tags.service.tag_catalog_cache", TagCatalogCache()
+    ), patch(
+        "src.tags.cache.redis_client", Mock(get=AsyncMock(return_value=b"1"))
+    ), patch(
+        "src.tags.service.async_session_maker", session_maker
+    ), patch(
+        "src.lifespan.top_books", AsyncMock(return_value=[("42", 7.0)])
+    ), patch(
+        "src.lifespan.async_session_maker", session_maker
+    ), patch(
+        "src.books.service.book_detail_cache", book_cache
+    ):
+        run = WarmUp(warm_up.steps)
+        asyncio.run(run.run())
+
+    assert run.status()["failed"] == {}
+    assert run.done == [name for name, _ in warm_up.steps]
+    session.exec.assert_awaited()
+    assert book_cache.preload.await_args.args[0] == ["42"]
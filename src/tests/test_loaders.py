@@ -0,0 +1,68 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.db.loaders import LoaderRegistry, uuid_key
+
+
+def make_loader(batches, registry=None):
+    async def batch_load(keys):
+        batches.append(keys)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    return (registry or LoaderRegistry()).get("words", batch_load)
+
+
+def test_loads_in_one_tick_share_a_batch():
+    batches = []
+
+    async def run():
+        loader = make_loader(batches)
+        results = await asyncio.gather(
+            loader.load("a"), loader.load("b"), loader.load("a"), loader.load("missing")
+        )
+        assert results == ["A", "B", "A", None]
+        assert await loader.load_many(["b", "missing"]) == ["B", None]
+
+    asyncio.run(run())
+    assert batches == [["a", "b", "missing"]]
+
+
+def test_cleared_loader_loads_again():
+    batches = []
+
+    async def run():
+        registry = LoaderRegistry()
+        loader = make_loader(batches, registry)
+        await loader.load("a")
+        registry.clear()
+        await loader.load("a")
+
+    asyncio.run(run())
+    assert batches == [["a"], ["a"]]
+
+
+def test_failed_batch_is_not_remembered():
+    calls = []
+
+    async def batch_load(keys):
+        calls.append(keys)
+        if len(calls) == 1:
+            raise RuntimeError("connection lost")
+        return {key: key for key in keys}
+
+    async def run():
+        loader = LoaderRegistry().get("flaky", batch_load)
+        with pytest.raises(RuntimeError):
+            await loader.load("a")
+        assert await loader.load("a") == "a"
+
+    asyncio.run(run())
+
+
+def test_uuid_key_rejects_malformed_ids():
+    id = uuid.uuid4()
+    assert uuid_key(str(id)) == id
+    assert uuid_key(id) is id
+    assert uuid_key("not-a-uuid") is None
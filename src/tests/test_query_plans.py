@@ -0,0 +1,299 @@
+"""Query plan regression suite.
+
+Runs every service query against a seeded Postgres database, EXPLAINs each
+statement it sent and fails on sequential scans or large sorts. Point
+TEST_DATABASE_URL at a scratch database to run it; its tables are dropped
+afterwards.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.service import UserService
+from src.books.schemas import BookUpdateModel
+from src.books.service import BookService
+from src.reviews.schemas import ReviewCreateModel
+from src.db.pagination import encode_cursor
+from src.reviews.service import ReviewService, review_sort_key
+from src.tags.schemas import TagAddModel, TagCreateModel
+from src.tags.service import TagService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="needs a scratch Postgres database"
+)
+
+# a sort over more rows than this should be served by an index instead
+SORT_ROW_LIMIT = 1000
+
+SEED_SQL = [
+    """
+    INSERT INTO users (id, username, email, first_name, last_name, role,
+                       is_verified, password_hash, created_at, updated_at)
+    SELECT gen_random_uuid(), 'user' || i, 'user' || i || '@example.com',
+           'First', 'Last', 'user', true, 'x', now(), now()
+    FROM generate_series(1, 5000) AS i
+    """,
+    """
+    INSERT INTO books (id, title, author, publisher, published_date, page_count,
+                       language, user_id, created_at, updated_at)
+    SELECT gen_random_uuid(), 'Book ' || i, 'Author', 'Publisher', '2020-01-01',
+           100 + i % 400, 'en', u.ids[1 + i % 5000],
+           now() - i * interval '1 minute', now()
+    FROM generate_series(1, 20000) AS i,
+         (SELECT array_agg(id) AS ids FROM users) u
+    """,
+    """
+    INSERT INTO reviews (id, rating, review_text, user_id, book_id,
+                         created_at, updated_at)
+    SELECT gen_random_uuid(), 1 + b.n % 4, 'Review', u.ids[1 + (b.n * 7) % 5000],
+           b.id, now(), now()
+    FROM (SELECT id, row_number() OVER () AS n FROM books) b,
+         (SELECT array_agg(id) AS ids FROM users) u
+    """,
+    """
+    INSERT INTO tags (id, name, created_at)
+    SELECT gen_random_uuid(), 'tag' || i, now()
+    FROM generate_series(1, 200) AS i
+    """,
+    """
+    INSERT INTO booktag (book_id, tag_id)
+    SELECT b.id, t.id
+    FROM (SELECT id, row_number() OVER () AS n FROM books) b
+    JOIN (SELECT id, row_number() OVER () AS n FROM tags) t
+      ON t.n = 1 + b.n % 200
+    """,
+]
+
+
+def make_engine():
+    return create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+
+
+async def seed():
+    engine = make_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        for statement in SEED_SQL:
+            await conn.execute(text(statement))
+        await conn.execute(text("ANALYZE"))
+
+    async with engine.connect() as conn:
+        row = (
+            await conn.execute(
+                text(
+                    """
+                    SELECT r.id AS review_id, r.user_id, r.book_id,
+                           u.email, t.id AS tag_id, b.created_at
+                    FROM reviews r
+                    JOIN users u ON u.id = r.user_id
+                    JOIN books b ON b.id = r.book_id
+                    JOIN booktag bt ON bt.book_id = b.id
+                    JOIN tags t ON t.id = bt.tag_id
+                    LIMIT 1
+                    """
+                )
+            )
+        ).one()
+    await engine.dispose()
+    return dict(row._mapping)
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    ids = asyncio.run(seed())
+    yield ids
+
+    async def drop():
+        engine = make_engine()
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+        await engine.dispose()
+
+    asyncio.run(drop())
+
+
+def find_problems(plan: dict) -> list:
+    problems = []
+    node_type = plan["Node Type"]
+    if node_type == "Seq Scan":
+        problems.append(f"Seq Scan on {plan['Relation Name']}")
+    if node_type in ("Sort", "Incremental Sort") and plan["Plan Rows"] > SORT_ROW_LIMIT:
+        problems.append(f"{node_type} of {plan['Plan Rows']} rows")
+    for child in plan.get("Plans", ()):
+        problems.extend(find_problems(child))
+    return problems
+
+
+async def check_plans(run) -> dict:
+    """Call run(session), then EXPLAIN every statement it sent"""
+    engine = make_engine()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            # one plan is enough for a batch of identical statements
+            statements.append(
+                (statement, parameters[0] if executemany else parameters)
+            )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await run(session)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    failures = {}
+    async with engine.connect() as conn:
+        # disabled scan types are still used when nothing else can answer
+        # the query, so a seq scan here means no usable index exists
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            problems = find_problems(plan[0]["Plan"])
+            if problems:
+                failures[statement] = problems
+    await engine.dispose()
+
+    assert statements, "nothing was captured"
+    return failures
+
+
+book_service = BookService()
+user_service = UserService()
+review_service = ReviewService(book_service, user_service)
+tag_service = TagService(book_service)
+
+CASES = {
+    "books.get_all_books": lambda s, ids: book_service.get_all_books(s, 20),
+    "books.get_user_books": lambda s, ids: book_service.get_user_books(
+        ids["user_id"], s, 20
+    ),
+    "books.search_books": lambda s, ids: book_service.search_books("book", s, 20),
+    "books.get_book": lambda s, ids: book_service.get_book(ids["book_id"], s),
+    "books.get_books_batch": lambda s, ids: book_service.get_books_batch(
+        [ids["book_id"], uuid.uuid4()], s
+    ),
+    "books.update_book": lambda s, ids: book_service.update_book(
+        ids["book_id"],
+        BookUpdateModel(
+            title="T", author="A", publisher="P", page_count=1, language="en"
+        ),
+        s,
+    ),
+    "users.get_user_by_email": lambda s, ids: user_service.get_user_by_email(
+        ids["email"], s
+    ),
+    "users.get_principal": lambda s, ids: user_service.get_principal(
+        ids["user_id"], s
+    ),
+    "users.get_user_profile": lambda s, ids: user_service.get_user_profile(
+        ids["user_id"], s
+    ),
+    "reviews.get_reviews_by_user": lambda s, ids: review_service.get_reviews_by_user(
+        ids["user_id"], s
+    ),
+    "reviews.get_book_reviews": lambda s, ids: review_service.get_book_reviews(
+        ids["book_id"], s
+    ),
+    "reviews.get_book_reviews_by_rating": lambda s, ids: (
+        review_service.get_book_reviews(ids["book_id"], s, sort="rating")
+    ),
+    "reviews.get_review_by_id": lambda s, ids: review_service.get_review_by_id(
+        ids["review_id"], s
+    ),
+    "reviews.update_review": lambda s, ids: review_service.update_review(
+        ids["review_id"], ids["user_id"], ReviewCreateModel(rating=3), s
+    ),
+    "tags.get_tags": lambda s, ids: tag_service.get_tags(s),
+    "tags.get_tag_by_id": lambda s, ids: tag_service.get_tag_by_id(ids["tag_id"], s),
+    "tags.add_tag": lambda s, ids: tag_service.add_tag(
+        TagCreateModel(name="plan-check"), s
+    ),
+    "tags.add_tags_to_book": lambda s, ids: tag_service.add_tags_to_book(
+        ids["book_id"], TagAddModel(tags=[TagCreateModel(name="plan-check-book")]), s
+    ),
+    "tags.update_tag": lambda s, ids: tag_service.update_tag(
+        ids["tag_id"], TagCreateModel(name="renamed"), s
+    ),
+}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_query_plans(seeded, case):
+    failures = asyncio.run(check_plans(lambda session: CASES[case](session, seeded)))
+
+    assert not failures, f"{case}: {failures}"
+
+
+def test_query_plans_next_page(seeded):
+    async def run(session):
+        page = await book_service.get_all_books(session, 20)
+        await book_service.get_all_books(session, 20, page["next_cursor"])
+
+    assert not asyncio.run(check_plans(run))
+
+
+def test_query_plans_book_reviews_next_page(seeded):
+    async def run(session):
+        for sort in ("newest", "rating"):
+            page = await review_service.get_book_reviews(
+                seeded["book_id"], session, sort=sort, limit=1
+            )
+            cursor = page["next_cursor"] or encode_cursor(
+                review_sort_key(page["items"][0], sort)
+            )
+            await review_service.get_book_reviews(
+                seeded["book_id"], session, sort=sort, limit=1, cursor=cursor
+            )
+
+    assert not asyncio.run(check_plans(run))
+
+
+def test_query_plans_deletes(seeded):
+    # deletes run last and on their own rows so the other cases still find theirs
+    async def run(session):
+        await review_service.delete_review(
+            seeded["review_id"], seeded["user_id"], session
+        )
+        await tag_service.delete_tag(seeded["tag_id"], session)
+        await book_service.delete_book(seeded["book_id"], session)
+
+    assert not asyncio.run(check_plans(run))
+
+
+def test_add_tags_to_book_statement_count(seeded):
+    async def count_statements(count: int) -> int:
+        engine = make_engine()
+        statements = []
+        event.listen(
+            engine.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        tags = [TagCreateModel(name=f"bulk-{count}-{n}") for n in range(count)]
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await tag_service.add_tags_to_book(
+                seeded["book_id"], TagAddModel(tags=tags), session
+            )
+        await engine.dispose()
+        return len(statements)
+
+    assert asyncio.run(count_statements(1)) == asyncio.run(count_statements(50))
@@ -0,0 +1,105 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi.routing import APIRoute
+
+from src import app
+from src.db.main import get_session
+from src.db.replicas import (
+    Replica,
+    ReplicaRouter,
+    get_read_session,
+    open_read_session,
+)
+
+
+def make_router(*lags):
+    router = ReplicaRouter(["postgresql+asyncpg://u:p@replica/db"] * len(lags))
+    for replica, lag in zip(router.replicas, lags):
+        if isinstance(lag, Exception):
+            replica.measure_lag = AsyncMock(side_effect=lag)
+        else:
+            replica.measure_lag = AsyncMock(return_value=lag)
+    return router
+
+
+def test_router_skips_lagging_and_failed_replicas():
+    router = make_router(60.0, ConnectionRefusedError(), 0.5)
+
+    chosen = asyncio.run(router.choose())
+
+    assert chosen is router.replicas[2]
+    assert not router.replicas[0].available
+    assert not router.replicas[1].available
+
+
+def test_router_returns_none_when_no_replica_is_usable():
+    router = make_router(60.0, OSError())
+
+    assert asyncio.run(router.choose()) is None
+
+
+def test_replica_health_is_cached_between_checks():
+    router = make_router(0.0)
+    replica: Replica = router.replicas[0]
+
+    asyncio.run(router.choose())
+    asyncio.run(router.choose())
+
+    assert replica.measure_lag.await_count == 1
+
+
+@pytest.mark.skipif(
+    not (os.getenv("TEST_PRIMARY_URL") and os.getenv("TEST_REPLICA_URL")),
+    reason="needs two local Postgres instances",
+)
+def test_reads_go_to_replica_unless_pinned(monkeypatch):
+    import src.db.replicas as replicas
+
+    router = ReplicaRouter([os.environ["TEST_REPLICA_URL"]])
+    monkeypatch.setattr(replicas, "replica_router", router)
+    request = Mock()
+    request.state.token_data = {"user": {"user_id": "u1"}}
+
+    async def bound_url(pinned):
+        monkeypatch.setattr(
+            replicas, "user_pinned_to_primary", AsyncMock(return_value=pinned)
+        )
+        session = await open_read_session(request)
+        try:
+            return str(session.bind.url)
+        finally:
+            await session.close()
+            await router.dispose()
+
+    assert asyncio.run(bound_url(False)) == str(router.replicas[0].engine.url)
+    assert asyncio.run(bound_url(True)) != str(router.replicas[0].engine.url)
+
+
+# POST only because the ids don't fit in a query string
+READ_ONLY_POSTS = {"/api/v1/books/batch"}
+
+
+def dependency_calls(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from dependency_calls(dependency)
+
+
+@pytest.mark.parametrize(
+    "route",
+    [
+        route
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and route.methods - {"GET", "HEAD"}
+        and route.path not in READ_ONLY_POSTS
+    ],
+    ids=lambda route: f"{sorted(route.methods)[0]} {route.path}",
+)
+def test_write_routes_use_the_primary_session(route):
+    calls = set(dependency_calls(route.dependant))
+
+    assert get_read_session not in calls
@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from src.db.models import Review
+from src.db.pagination import encode_cursor
+from src.errors import InvalidCursor
+from src.reviews.service import decode_review_cursor, review_sort_key
+
+
+def make_review():
+    return Review(
+        id=uuid.uuid4(),
+        rating=4,
+        review_text="Good",
+        created_at=datetime(2025, 1, 25, 23, 57, 49),
+    )
+
+
+def test_review_cursor_round_trip():
+    review = make_review()
+
+    newest = encode_cursor(review_sort_key(review, "newest"))
+    assert decode_review_cursor(newest, "newest") == (review.created_at, review.id)
+
+    rating = encode_cursor(review_sort_key(review, "rating"))
+    assert decode_review_cursor(rating, "rating") == (
+        4,
+        review.created_at,
+        review.id,
+    )
+
+
+def test_review_cursor_must_match_sort():
+    review = make_review()
+    newest = encode_cursor(review_sort_key(review, "newest"))
+
+    for cursor, sort in [
+        (newest, "rating"),
+        (encode_cursor(["4", review.created_at.isoformat(), str(review.id)]), "rating"),
+        (encode_cursor(["yesterday", str(review.id)]), "newest"),
+    ]:
+        with pytest.raises(InvalidCursor):
+            decode_review_cursor(cursor, sort)